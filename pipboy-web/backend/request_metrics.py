@@ -0,0 +1,153 @@
+"""
+Request Metrics Module
+
+Per-route request latency, response size, time spent reading game and profile
+files, and JSON serialization time for the Pip-Boy server. Exposed as
+Prometheus text on GET /metrics. Slow requests are logged with their timings.
+"""
+
+import logging
+import threading
+import time
+from functools import wraps
+
+from flask import Response, request
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def lines(self, name, labels):
+        lines = [
+            f'{name}_bucket{{{labels},le="{bound}"}} {count}'
+            for bound, count in zip(self.buckets, self.counts)
+        ]
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+class RequestMetrics:
+    """Request timing middleware and metrics registry for a Flask app"""
+
+    def __init__(self, slow_request_seconds=0.25):
+        """Initialize empty metrics; requests slower than slow_request_seconds are logged"""
+        self.slow_request_seconds = slow_request_seconds
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.started = time.time()
+
+        # Histogram families by name, each keyed by label string
+        self.histograms = {
+            'pipboy_request_seconds': {},
+            'pipboy_data_seconds': {},
+            'pipboy_json_seconds': {},
+            'pipboy_response_bytes': {},
+        }
+        self.responses = {}
+
+    def init_app(self, app):
+        """Time every request of app and add GET /metrics"""
+        metrics = self
+
+        class TimedJSONProvider(DefaultJSONProvider):
+            def dumps(self, obj, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return super().dumps(obj, **kwargs)
+                finally:
+                    metrics._add('json_seconds', time.perf_counter() - started)
+
+        app.json = TimedJSONProvider(app)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view, methods=['GET'])
+
+    def track(self, obj, *method_names):
+        """Charge calls to obj's methods (game file and profile reads) to data time"""
+        for name in method_names:
+            setattr(obj, name, self._timed_data(getattr(obj, name)))
+
+    def _timed_data(self, method):
+        @wraps(method)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._add('data_seconds', time.perf_counter() - started)
+        return timed
+
+    def _add(self, field, seconds):
+        setattr(self.local, field, getattr(self.local, field, 0.0) + seconds)
+
+    def _before_request(self):
+        self.local.started = time.perf_counter()
+        self.local.data_seconds = 0.0
+        self.local.json_seconds = 0.0
+
+    def _after_request(self, response):
+        seconds = time.perf_counter() - getattr(self.local, 'started', time.perf_counter())
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        labels = f'route="{route}",method="{request.method}"'
+
+        with self.lock:
+            self._observe('pipboy_request_seconds', labels, LATENCY_BUCKETS, seconds)
+            self._observe('pipboy_data_seconds', labels, LATENCY_BUCKETS, self.local.data_seconds)
+            self._observe('pipboy_json_seconds', labels, LATENCY_BUCKETS, self.local.json_seconds)
+            if not response.is_streamed:
+                self._observe('pipboy_response_bytes', labels, SIZE_BUCKETS, response.content_length or 0)
+            key = f'{labels},status="{response.status_code}"'
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+        if seconds >= self.slow_request_seconds:
+            logger.warning(
+                f"Slow request {request.method} {request.path}: {seconds * 1000:.1f} ms "
+                f"(data {self.local.data_seconds * 1000:.1f} ms, json {self.local.json_seconds * 1000:.1f} ms)"
+            )
+        return response
+
+    def _observe(self, name, labels, buckets, value):
+        family = self.histograms[name]
+        if labels not in family:
+            family[labels] = Histogram(buckets)
+        family[labels].observe(value)
+
+    def metrics_view(self):
+        return Response(self.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+    def render_prometheus(self):
+        """Metrics in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            for name, family in self.histograms.items():
+                lines.append(f'# TYPE {name} histogram')
+                for labels, histogram in sorted(family.items()):
+                    lines.extend(histogram.lines(name, labels))
+
+            lines.append('# TYPE pipboy_responses_total counter')
+            lines += [f'pipboy_responses_total{{{key}}} {count}' for key, count in sorted(self.responses.items())]
+            lines.append('# TYPE pipboy_uptime_seconds gauge')
+            lines.append(f'pipboy_uptime_seconds {time.time() - self.started:.0f}')
+        return '\n'.join(lines) + '\n'
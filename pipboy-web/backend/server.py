@@ -18,6 +18,7 @@ import time
 # Import custom modules
 from game_bridge import GameBridge
 from profile_manager import ProfileManager
+from request_metrics import RequestMetrics
 
 # Setup logging
 logging.basicConfig(
@@ -40,6 +41,13 @@ with open(CONFIG_PATH, 'r') as f:
 game_bridge = GameBridge(config)
 profile_manager = ProfileManager(config['profiles_dir'])
 
+# Per-route latency, response size, file read and JSON time on GET /metrics
+request_metrics = RequestMetrics(config.get('slow_request_ms', 250) / 1000)
+request_metrics.init_app(app)
+request_metrics.track(game_bridge, 'get_game_state', 'get_character_data', 'send_action', 'read_action_result')
+request_metrics.track(profile_manager, 'list_profiles', 'get_profile', 'create_profile',
+                      'update_profile', 'delete_profile')
+
 # Track connected clients
 connected_clients = set()
 
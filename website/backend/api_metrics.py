@@ -0,0 +1,210 @@
+"""
+API Server Self-Instrumentation
+
+Per-route request latency, response size, time spent in SQLite and time spent
+serializing JSON, for the Flask API server. Exposed as Prometheus text on
+GET /metrics, in the same format as the collector's metrics.
+
+SQL statements are timed by the connections themselves (see connection_class);
+any statement slower than slow_query_seconds is logged with its EXPLAIN QUERY
+PLAN, so a missing index shows up in the log instead of as a stutter on stream.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict
+
+from flask import Response, request
+from flask.json.provider import DefaultJSONProvider
+
+from collector_metrics import Histogram, LATENCY_BUCKETS
+
+# Histogram bucket upper bounds, in bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Statements worth explaining (not BEGIN/COMMIT/PRAGMA)
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that charges execute and fetch time to its connection's metrics"""
+
+    def execute(self, sql, parameters=()):
+        self._start_statement((sql, parameters))
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._start_statement((sql, ()))
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        return self._timed(super().fetchone, fetch=True)
+
+    def fetchmany(self, size=None):
+        return self._timed(super().fetchmany, self.arraysize if size is None else size, fetch=True)
+
+    def fetchall(self):
+        return self._timed(super().fetchall, fetch=True)
+
+    def _start_statement(self, statement):
+        self.statement = statement
+        self.elapsed = 0.0
+        self.measuring = True
+
+    def _timed(self, method, *args, fetch=False):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            seconds = time.perf_counter() - started
+            metrics = self.connection.metrics
+            metrics.add_db_time(seconds)
+            # Only execute plus the first fetch (time to first rows) counts toward
+            # the slow-query threshold, not a whole stream of fetchmany() calls
+            if getattr(self, 'measuring', False):
+                self.elapsed += seconds
+                if self.elapsed >= metrics.slow_query_seconds:
+                    self.measuring = False
+                    metrics.slow_query(self.connection, *self.statement, self.elapsed)
+                elif fetch:
+                    self.measuring = False
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors (including execute() shortcuts) are TimedCursors"""
+
+    metrics = None  # Set on the subclass made by ApiMetrics
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that charges dumps() time to the current request"""
+
+    metrics = None  # Set on the subclass made by ApiMetrics
+
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            self.metrics.add_json_time(time.perf_counter() - started)
+
+
+class ApiMetrics:
+    """Thread-safe request metrics registry for one API server process"""
+
+    def __init__(self, slow_query_seconds: float = 0.1):
+        self.slow_query_seconds = slow_query_seconds
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.started = time.time()
+
+        self.request_seconds: Dict[tuple, Histogram] = {}
+        self.response_bytes: Dict[str, Histogram] = {}
+        self.db_seconds: Dict[str, Histogram] = {}
+        self.json_seconds: Dict[str, Histogram] = {}
+        self.responses: Dict[tuple, int] = {}
+        self.slow_queries = 0
+
+        # Pass as ReadOnlyConnectionPool(connection_class=...)
+        self.connection_class = type('TimedConnection', (TimedConnection,), {'metrics': self})
+
+    def init_app(self, app):
+        """Instrument every request of a Flask app and add GET /metrics"""
+        app.json = type('TimedJSONProvider', (TimedJSONProvider,), {'metrics': self})(app)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view, methods=['GET'])
+
+    def add_db_time(self, seconds: float):
+        self.local.db_seconds = getattr(self.local, 'db_seconds', 0.0) + seconds
+
+    def add_json_time(self, seconds: float):
+        self.local.json_seconds = getattr(self.local, 'json_seconds', 0.0) + seconds
+
+    def slow_query(self, conn: sqlite3.Connection, sql: str, parameters, seconds: float):
+        """Log a slow statement with its query plan"""
+        with self.lock:
+            self.slow_queries += 1
+        statement = ' '.join(sql.split())
+        plan = ''
+        if statement.upper().startswith(EXPLAINABLE):
+            try:
+                # A plain cursor, so explaining isn't timed (or explained) itself
+                rows = sqlite3.Cursor(conn).execute(f'EXPLAIN QUERY PLAN {sql}', parameters).fetchall()
+                plan = ''.join(f"\n    {row[3]}" for row in rows)
+            except sqlite3.Error as e:
+                plan = f"\n    (no plan: {e})"
+        logging.warning(f"Slow query ({seconds * 1000:.1f} ms): {statement}{plan}")
+
+    def _before_request(self):
+        self.local.started = time.perf_counter()
+        self.local.db_seconds = 0.0
+        self.local.json_seconds = 0.0
+
+    def _after_request(self, response):
+        seconds = time.perf_counter() - getattr(self.local, 'started', time.perf_counter())
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        with self.lock:
+            # Streamed bodies (export, live feed) are still being produced: time to headers only
+            _observe(self.request_seconds, (route, request.method), LATENCY_BUCKETS, seconds)
+            _observe(self.db_seconds, route, LATENCY_BUCKETS, self.local.db_seconds)
+            _observe(self.json_seconds, route, LATENCY_BUCKETS, self.local.json_seconds)
+            if not response.is_streamed:
+                _observe(self.response_bytes, route, SIZE_BUCKETS, response.content_length or 0)
+            status_key = (route, request.method, response.status_code)
+            self.responses[status_key] = self.responses.get(status_key, 0) + 1
+        return response
+
+    def metrics_view(self):
+        return Response(self.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+    def render_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        with self.lock:
+            lines = [
+                '# HELP api_request_seconds Time from request to response headers',
+                '# TYPE api_request_seconds histogram',
+            ]
+            for (route, method), histogram in sorted(self.request_seconds.items()):
+                lines.extend(histogram.lines('api_request_seconds', f'route="{route}",method="{method}"'))
+
+            for name, help_text, histograms in (
+                ('api_db_seconds', 'SQLite execute and fetch time per request', self.db_seconds),
+                ('api_json_seconds', 'JSON serialization time per request', self.json_seconds),
+                ('api_response_bytes', 'Response body size (non-streamed)', self.response_bytes),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for route, histogram in sorted(histograms.items()):
+                    lines.extend(histogram.lines(name, f'route="{route}"'))
+
+            lines += [
+                '# HELP api_responses_total Responses per route and status',
+                '# TYPE api_responses_total counter',
+            ]
+            lines += [f'api_responses_total{{route="{route}",method="{method}",status="{status}"}} {count}'
+                      for (route, method, status), count in sorted(self.responses.items())]
+
+            lines += [
+                '# TYPE api_slow_queries_total counter',
+                f'api_slow_queries_total {self.slow_queries}',
+                '# TYPE api_uptime_seconds gauge',
+                f'api_uptime_seconds {time.time() - self.started:.0f}',
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+def _observe(histograms: Dict, key, buckets, value: float):
+    if key not in histograms:
+        histograms[key] = Histogram(buckets)
+    histograms[key].observe(value)
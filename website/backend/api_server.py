@@ -5,165 +5,343 @@ Serves collected data from SQLite database to frontend.
 RESTful API endpoints for game state, history, statistics.
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
+from werkzeug.datastructures import MultiDict
 import sqlite3
 import json
+import base64
+import binascii
+import csv
+import io
+import re
+import zlib
 from datetime import datetime, timedelta
+from contextlib import contextmanager
+from functools import wraps
 from pathlib import Path
-from character_data_generator import CharacterDataGenerator
+from api_metrics import ApiMetrics
+from character_data_generator import EXTENDED_SECTIONS, CharacterDataGenerator
+from delta_store import inventory_at, skills_at
+from archive import ARCHIVED_TABLES, SnapshotArchive
+from db_pool import ReadOnlyConnectionPool
+from downsample import lttb
+from live_feed import LiveFeed
+from response_cache import ResponseCache
+import rollups
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend
 
 DB_PATH = "./database/game_data.db"
 GAME_DATA_DIR = Path("../..")
+ARCHIVE_DIR = "./database/archive"
+
+# Per-route latency/size/DB/JSON histograms on /metrics, slow query plans in the log
+api_metrics = ApiMetrics(slow_query_seconds=0.1)
+api_metrics.init_app(app)
+
+snapshot_archive = SnapshotArchive(ARCHIVE_DIR)
+db_pool = ReadOnlyConnectionPool(DB_PATH, connection_class=api_metrics.connection_class)
+response_cache = ResponseCache()
+live_feed = LiveFeed(db_pool)
+
+# One generator per process; parsed game files and generated sections are
+# reused until ai_state/character_data/ai_memory.json change on disk
+generator = CharacterDataGenerator(str(GAME_DATA_DIR))
+
+# Keyset pagination for the event tables
+MAX_PAGE_SIZE = 1000
+TIMESTAMP_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}( \d{2}:\d{2}(:\d{2})?)?$')
+
+# Tables served by /api/export/<table> -> column for ?start=/?end= (None: no time filter)
+EXPORT_TABLES = {
+    'game_states': 'timestamp',
+    'inventory_snapshots': 'timestamp',
+    'events': 'timestamp',
+    'milestones': 'timestamp',
+    'decisions': 'timestamp',
+    'skills': 'timestamp',
+    'stats': 'timestamp',
+    'session_stats': 'timestamp',
+    'items_collected': 'timestamp',
+    'inventory_changes': 'timestamp',
+    'skill_changes': 'timestamp',
+    'game_states_1m': 'bucket',
+    'game_states_1h': 'bucket',
+    'kill_steps': 'timestamp',
+    'map_visits': 'entered_at',
+    'session_summary': None,
+}
+EXPORT_BATCH_SIZE = 1000
+
+# Database-backed resources by name, see resource()
+RESOURCES = {}
+MAX_BATCH_RESOURCES = 20
+
+# Response headers worth replaying from the cache
+CACHED_HEADERS = ('Content-Type', 'X-Stats-Resolution')
 
 def get_db():
-    """Get database connection"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # Return rows as dictionaries
-    return conn
+    """Get this worker thread's pooled read-only connection (don't close it)"""
+    return db_pool.connection()
+
+@app.errorhandler(sqlite3.DatabaseError)
+def handle_database_error(e):
+    """Drop the thread's connection so the next request reconnects cleanly"""
+    db_pool.discard()
+    return jsonify({"error": str(e), "message": "Database unavailable"}), 503
+
+def cached(view):
+    """Serve a database-backed endpoint from the response cache until the next commit"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != 'GET':
+            return view(*args, **kwargs)
+        version = response_cache.data_version(get_db())
+        if version is None:
+            return view(*args, **kwargs)  # Collector doesn't version its commits
+        
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        entry = response_cache.get(key, version)
+        if entry is None:
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+            entry = response_cache.put(key, version, response.get_data(), response.status_code, headers)
+        
+        response = Response(entry.body, status=entry.status, headers=list(entry.headers))
+        response.set_etag(entry.etag)
+        response.last_modified = entry.last_modified
+        response.headers['Cache-Control'] = 'no-cache'
+        # Answers If-None-Match / If-Modified-Since with 304
+        return response.make_conditional(request)
+    return wrapper
+
+class ApiError(Exception):
+    """Error response (status, JSON payload) raised from a resource"""
+    
+    def __init__(self, status, payload):
+        super().__init__(payload.get('error'))
+        self.status = status
+        self.payload = payload
+
+@app.errorhandler(ApiError)
+def handle_api_error(e):
+    return jsonify(e.payload), e.status
+
+@contextmanager
+def read_snapshot(conn):
+    """Cursor inside one read transaction, so every query sees the same commit"""
+    conn.execute('BEGIN')
+    try:
+        yield conn.cursor()
+    finally:
+        if conn.in_transaction:
+            conn.execute('COMMIT')
+
+def resource(name):
+    """Register fn(cursor, args, headers) -> body as GET /api/<name> and for /api/batch"""
+    def register(fn):
+        RESOURCES[name] = fn
+        app.add_url_rule(f'/api/{name}', f'get_{fn.__name__}', cached(lambda: serve_resource(name)),
+                         methods=['GET'])
+        return fn
+    return register
+
+def serve_resource(name):
+    """Run one resource against the request's query args"""
+    headers = {}
+    with read_snapshot(get_db()) as cursor:
+        body = RESOURCES[name](cursor, request.args, headers)
+    response = jsonify(body)
+    response.headers.update(headers)
+    return response
+
+def encode_cursor(row, time_column='timestamp'):
+    """Opaque page cursor for a row's (timestamp, id) position"""
+    return base64.urlsafe_b64encode(f"{row[time_column]}|{row['id']}".encode()).decode()
+
+def decode_cursor(value):
+    """(timestamp, id) from a page cursor; raises ValueError if malformed"""
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(value.encode()).decode().rsplit('|', 1)
+        return timestamp, int(row_id)
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(str(e))
+
+def keyset_page(cursor, args, table, key, default_limit=100, time_column='timestamp', filters=()):
+    """
+    One page of an event table, newest first, walked by (timestamp, id).
+    
+    ?cursor=<next_cursor> continues to older rows. ?since=<latest_cursor>
+    (or a 'YYYY-MM-DD HH:MM:SS' timestamp) returns only newer rows, for
+    incremental sync. Both are range reads on the table's timestamp index.
+    filters are extra (sql, value) conditions.
+    """
+    limit = min(max(args.get('limit', default_limit, type=int), 1), MAX_PAGE_SIZE)
+    
+    conditions = [condition for condition, _ in filters]
+    params = [value for _, value in filters]
+    try:
+        if args.get('cursor'):
+            conditions.append(f'({time_column}, id) < (?, ?)')
+            params.extend(decode_cursor(args['cursor']))
+        since = args.get('since')
+        if since:
+            conditions.append(f'({time_column}, id) > (?, ?)')
+            if TIMESTAMP_PATTERN.match(since):
+                params.extend((since, -1))  # Rows at or after the timestamp
+            else:
+                params.extend(decode_cursor(since))
+    except ValueError:
+        raise ApiError(400, {"error": "Invalid cursor"})
+    
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    
+    cursor.execute(f'''
+        SELECT * FROM {table}
+        {where}
+        ORDER BY {time_column} DESC, id DESC
+        LIMIT ?
+    ''', (*params, limit + 1))
+    rows = [dict(row) for row in cursor.fetchall()]
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    return {
+        key: rows,
+        "next_cursor": encode_cursor(rows[-1], time_column) if has_more else None,
+        "latest_cursor": encode_cursor(rows[0], time_column) if rows else args.get('since'),
+    }
 
-@app.route('/api/current-state', methods=['GET'])
-def get_current_state():
-    """Get most recent game state"""
-    conn = get_db()
-    cursor = conn.cursor()
+def get_storage_mode(cursor):
+    """'delta' when the collector stores only inventory/skill changes"""
+    try:
+        cursor.execute("SELECT value FROM collector_meta WHERE key = 'storage_mode'")
+    except sqlite3.OperationalError:
+        return 'full'  # Database predates collector_meta
+    row = cursor.fetchone()
+    return row[0] if row else 'full'
+
+@resource('current-state')
+def current_state(cursor, args, headers):
+    """Get most recent game state (or the one given by ?snapshot=<id>)"""
+    snapshot_id = args.get('snapshot', type=int)
     
     # Get latest state
-    cursor.execute('''
-        SELECT * FROM game_states 
-        ORDER BY timestamp DESC 
-        LIMIT 1
-    ''')
+    if snapshot_id is None:
+        cursor.execute('''
+            SELECT * FROM game_states 
+            ORDER BY timestamp DESC, id DESC 
+            LIMIT 1
+        ''')
+    else:
+        cursor.execute('SELECT * FROM game_states WHERE id = ?', (snapshot_id,))
     state = cursor.fetchone()
     
     if not state:
-        return jsonify({"error": "No data available"}), 404
-    
-    # Get latest inventory
-    cursor.execute('''
-        SELECT DISTINCT item_name, item_pid, quantity 
-        FROM inventory_snapshots 
-        WHERE timestamp >= (SELECT timestamp FROM game_states ORDER BY timestamp DESC LIMIT 1)
-    ''')
-    inventory = [dict(row) for row in cursor.fetchall()]
-    
-    # Get latest session stats
+        raise ApiError(404, {"error": "No data available"})
+    
+    # Get the snapshot's inventory
+    if get_storage_mode(cursor) == 'delta':
+        inventory = [dict(row) for row in inventory_at(cursor, state['id'])]
+    else:
+        cursor.execute('''
+            SELECT item_name, item_pid, quantity 
+            FROM inventory_snapshots 
+            WHERE snapshot_id = ?
+        ''', (state['id'],))
+        inventory = [dict(row) for row in cursor.fetchall()]
+    
+    # Get the snapshot's session stats
     cursor.execute('''
         SELECT * FROM session_stats 
-        ORDER BY timestamp DESC 
-        LIMIT 1
-    ''')
+        WHERE snapshot_id = ?
+    ''', (state['id'],))
     session = cursor.fetchone()
     
-    conn.close()
-    
-    return jsonify({
+    return {
         "state": dict(state) if state else {},
         "inventory": inventory,
         "session": dict(session) if session else {}
-    })
+    }
 
-@app.route('/api/stats-history', methods=['GET'])
-def get_stats_history():
+@resource('stats-history')
+def stats_history(cursor, args, headers):
     """Get character stats over time"""
-    hours = request.args.get('hours', 1, type=int)
-    
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT timestamp, hp_current, hp_max, level, experience, armor_class
-        FROM game_states 
-        WHERE timestamp >= datetime('now', '-' || ? || ' hours')
-        ORDER BY timestamp ASC
-    ''', (hours,))
-    
-    history = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    
-    return jsonify(history)
+    hours = args.get('hours', 1, type=float)
+    resolution = args.get('resolution')
+    points = args.get('points', type=int)
+    if points is not None:
+        points = max(points, 3)
+    
+    # Raw rows for short windows, minute/hour rollups for longer ones (or
+    # the coarsest rollup that still has ?points= buckets)
+    resolution, history = rollups.history(cursor, hours, resolution, points)
+    
+    if resolution == 'raw':
+        # Raw rows older than the live database come from archive segments
+        start = (datetime.utcnow() - timedelta(hours=hours)).strftime('%Y-%m-%d %H:%M:%S')
+        live_start = history[0]['timestamp'] if history else None
+        columns = ['timestamp', 'hp_current', 'hp_max', 'level', 'experience', 'armor_class']
+        archived = sorted(
+            ({name: row.get(name) for name in columns}
+             for row in snapshot_archive.read('game_states', start, live_start)),
+            key=lambda row: row['timestamp']
+        )
+        history = archived + history
+    
+    if points:
+        # Shape-preserving reduction to what the chart can draw
+        history = lttb(history, points, 'hp_current')
+    
+    headers['X-Stats-Resolution'] = resolution
+    return history
 
-@app.route('/api/skills-current', methods=['GET'])
-def get_current_skills():
-    """Get current skill levels"""
-    conn = get_db()
-    cursor = conn.cursor()
+@resource('skills-current')
+def current_skills(cursor, args, headers):
+    """Get current skill levels (or as of ?snapshot=<id>)"""
+    snapshot_id = args.get('snapshot', type=int)
     
     # Get most recent skills
-    cursor.execute('''
-        SELECT skill_name, skill_value, timestamp
-        FROM skills 
-        WHERE timestamp = (SELECT MAX(timestamp) FROM skills)
-    ''')
-    
-    skills = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    
-    return jsonify(skills)
+    if get_storage_mode(cursor) == 'delta':
+        skills = [dict(row) for row in skills_at(cursor, snapshot_id)]
+    else:
+        if snapshot_id is None:
+            # Latest by time; backfilled captures can have higher ids
+            cursor.execute('SELECT id FROM game_states ORDER BY timestamp DESC, id DESC LIMIT 1')
+            row = cursor.fetchone()
+            snapshot_id = row[0] if row else None
+        cursor.execute('''
+            SELECT skill_name, skill_value, timestamp
+            FROM skills 
+            WHERE snapshot_id = ?
+        ''', (snapshot_id,))
+        skills = [dict(row) for row in cursor.fetchall()]
+    
+    return skills
 
-@app.route('/api/milestones', methods=['GET'])
-def get_milestones():
-    """Get all milestones"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT * FROM milestones 
-        ORDER BY timestamp DESC
-    ''')
-    
-    milestones = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    
-    return jsonify(milestones)
+@resource('milestones')
+def milestones(cursor, args, headers):
+    """Get milestones, newest first (?limit=, ?cursor=, ?since=)"""
+    return keyset_page(cursor, args, 'milestones', 'milestones', default_limit=100)
 
-@app.route('/api/items-collected', methods=['GET'])
-def get_items_collected():
-    """Get history of items collected"""
-    limit = request.args.get('limit', 100, type=int)
-    
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT * FROM items_collected 
-        ORDER BY timestamp DESC
-        LIMIT ?
-    ''', (limit,))
-    
-    items = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    
-    return jsonify(items)
+@resource('items-collected')
+def items_collected(cursor, args, headers):
+    """Get history of items collected, newest first (?limit=, ?cursor=, ?since=)"""
+    return keyset_page(cursor, args, 'items_collected', 'items', default_limit=100)
 
-@app.route('/api/decisions', methods=['GET'])
-def get_decisions():
-    """Get AI decision history"""
-    limit = request.args.get('limit', 50, type=int)
-    
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT * FROM decisions 
-        ORDER BY timestamp DESC
-        LIMIT ?
-    ''', (limit,))
-    
-    decisions = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    
-    return jsonify(decisions)
+@resource('decisions')
+def decisions(cursor, args, headers):
+    """Get AI decision history, newest first (?limit=, ?cursor=, ?since=)"""
+    return keyset_page(cursor, args, 'decisions', 'decisions', default_limit=50)
 
-@app.route('/api/session-stats', methods=['GET'])
-def get_session_stats():
+@resource('session-stats')
+def session_stats(cursor, args, headers):
     """Get aggregated session statistics"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
     # Get latest session
     cursor.execute('''
         SELECT * FROM session_stats 
@@ -172,72 +350,48 @@ def get_session_stats():
     ''')
     current_session = cursor.fetchone()
     
-    # Get progression over time
+    # Run totals and kill steps, maintained by the collector as it ingests
     cursor.execute('''
-        SELECT 
-            COUNT(DISTINCT DATE(timestamp)) as days_played,
-            MAX(level) as max_level,
-            MAX(experience) as total_xp,
-            COUNT(*) as total_snapshots
-        FROM game_states
+        SELECT days_played, max_level, total_xp, total_snapshots
+        FROM session_summary
     ''')
     aggregated = cursor.fetchone()
     
-    # Get kill count progression
     cursor.execute('''
-        SELECT timestamp, total_kills 
-        FROM session_stats 
+        SELECT timestamp, total_kills
+        FROM kill_steps
         ORDER BY timestamp ASC
     ''')
     kill_history = [dict(row) for row in cursor.fetchall()]
     
-    conn.close()
-    
-    return jsonify({
+    return {
         "current": dict(current_session) if current_session else {},
         "aggregated": dict(aggregated) if aggregated else {},
         "kill_history": kill_history
-    })
+    }
 
-@app.route('/api/location-history', methods=['GET'])
-def get_location_history():
-    """Get visited locations"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT DISTINCT map_name, MIN(timestamp) as first_visit, MAX(timestamp) as last_visit
-        FROM game_states
-        GROUP BY map_name
-        ORDER BY first_visit ASC
-    ''')
-    
-    locations = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    
-    return jsonify(locations)
+@resource('location-history')
+def location_history(cursor, args, headers):
+    """Get map visits, newest first (?map=, ?limit=, ?cursor=, ?since=)"""
+    # One row per continuous stay, maintained by the collector
+    filters = []
+    if args.get('map'):
+        filters.append(('map_name = ?', args['map']))
+    return keyset_page(cursor, args, 'map_visits', 'visits', default_limit=100,
+                       time_column='entered_at', filters=filters)
 
-@app.route('/api/combat-stats', methods=['GET'])
-def get_combat_stats():
+@resource('combat-stats')
+def combat_stats(cursor, args, headers):
     """Get combat statistics"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    # Combat encounters
+    # Combat time and HP-in-combat mean, maintained by the collector
     cursor.execute('''
-        SELECT COUNT(*) as combat_encounters
-        FROM game_states
-        WHERE in_combat = 1
+        SELECT combat_encounters, combat_hp_pct_sum, combat_hp_samples
+        FROM session_summary
     ''')
-    encounters = cursor.fetchone()
-    
-    # Average HP during combat
-    cursor.execute('''
-        SELECT AVG(hp_current * 100.0 / hp_max) as avg_hp_percent
-        FROM game_states
-        WHERE in_combat = 1 AND hp_max > 0
-    ''')
-    avg_hp = cursor.fetchone()
+    summary = cursor.fetchone()
+    encounters = {"combat_encounters": summary['combat_encounters'] if summary else 0}
+    avg_hp = {"avg_hp_percent": summary['combat_hp_pct_sum'] / summary['combat_hp_samples']
+              if summary and summary['combat_hp_samples'] else None}
     
     # Latest kills/damage
     cursor.execute('''
@@ -248,13 +402,92 @@ def get_combat_stats():
     ''')
     latest = cursor.fetchone()
     
-    conn.close()
-    
-    return jsonify({
-        "encounters": dict(encounters) if encounters else {},
-        "avg_hp_in_combat": dict(avg_hp) if avg_hp else {},
+    return {
+        "encounters": encounters,
+        "avg_hp_in_combat": avg_hp,
         "latest": dict(latest) if latest else {}
-    })
+    }
+
+@app.route('/api/batch', methods=['GET', 'POST'])
+@cached
+def get_batch():
+    """
+    Several resources read from one database snapshot.
+    
+    GET  /api/batch?resources=current-state,milestones&milestones.limit=20
+    POST /api/batch  {"resources": [{"name": "milestones", "params": {"limit": 20}}, ...]}
+    
+    POSTed entries may set "id" to request one resource twice with different params.
+    """
+    if request.method == 'POST':
+        requested = batch_from_json(request.get_json(silent=True))
+    else:
+        requested = batch_from_args(request.args)
+    return jsonify(run_batch(requested))
+
+def batch_from_json(payload):
+    """[(key, name, params)] from a POSTed {"resources": [...]} document"""
+    entries = payload.get('resources') if isinstance(payload, dict) else None
+    if not isinstance(entries, list):
+        raise ApiError(400, {"error": "Expected {\"resources\": [...]}"})
+    requested = []
+    for index, entry in enumerate(entries):
+        if isinstance(entry, str):
+            entry = {"name": entry}
+        if not isinstance(entry, dict):
+            raise ApiError(400, {"error": f"resources[{index}]: expected a name or an object"})
+        name = entry.get('name')
+        key = entry.get('id', name)
+        params = entry.get('params') or {}
+        if not isinstance(name, str) or not isinstance(key, str):
+            raise ApiError(400, {"error": f"resources[{index}]: \"name\" and \"id\" must be strings"})
+        if not isinstance(params, dict):
+            raise ApiError(400, {"error": f"resources[{index}]: \"params\" must be an object"})
+        params = MultiDict({param: str(value) for param, value in params.items()})
+        requested.append((key, name, params))
+    return requested
+
+def batch_from_args(args):
+    """[(key, name, params)] from ?resources=a,b&a.limit=10"""
+    names = [name for name in args.get('resources', '').split(',') if name]
+    return [
+        (name, name, MultiDict([(key[len(name) + 1:], value)
+                                for key, value in args.items(multi=True)
+                                if key.startswith(name + '.')]))
+        for name in names
+    ]
+
+def run_batch(requested):
+    """Run the requested resources in one read transaction"""
+    unknown = [name for _, name, _ in requested if name not in RESOURCES]
+    if unknown or not requested or len(requested) > MAX_BATCH_RESOURCES:
+        raise ApiError(400, {
+            "error": f"Unknown resources: {', '.join(map(str, unknown))}" if unknown
+                     else f"Request 1 to {MAX_BATCH_RESOURCES} resources",
+            "resources": sorted(RESOURCES)
+        })
+    
+    # Results are keyed by id (default: name), so each key may appear once
+    keys = [key for key, _, _ in requested]
+    duplicates = sorted({key for key in keys if keys.count(key) > 1})
+    if duplicates:
+        raise ApiError(400, {
+            "error": f"Duplicate resources: {', '.join(duplicates)}; give each an \"id\""
+        })
+    
+    results = {}
+    with read_snapshot(get_db()) as cursor:
+        cursor.execute('SELECT MAX(id) FROM game_states')
+        latest_snapshot = cursor.fetchone()[0]
+        for key, name, params in requested:
+            headers = {}
+            try:
+                body = RESOURCES[name](cursor, params, headers)
+                results[key] = {"status": 200, "data": body, "headers": headers}
+            except ApiError as e:
+                results[key] = {"status": e.status, **e.payload}
+    
+    return {"snapshot_id": latest_snapshot, "results": results}
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -264,7 +497,6 @@ def health_check():
         cursor = conn.cursor()
         cursor.execute('SELECT COUNT(*) FROM game_states')
         count = cursor.fetchone()[0]
-        conn.close()
         
         return jsonify({
             "status": "healthy",
@@ -272,33 +504,138 @@ def health_check():
             "total_states": count
         })
     except Exception as e:
+        db_pool.discard()
         return jsonify({
             "status": "unhealthy",
             "error": str(e)
         }), 500
 
+@app.route('/api/live', methods=['GET'])
+def live_events():
+    """Server-Sent Events feed of new states, milestones, decisions and items"""
+    # Browsers resend the last id on reconnect; ?last_event_id= for other clients
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    return Response(
+        (chunk.encode() for chunk in live_feed.stream(last_event_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/export/<table>', methods=['GET'])
+def export_table(table):
+    """Stream a whole table as NDJSON or CSV (?format=, ?start=, ?end=, ?archive=0)"""
+    body, mimetype, headers = export_stream(table, request.args, request.headers.get('Accept-Encoding', ''))
+    return Response(body, mimetype=mimetype, headers=headers)
+
+def export_stream(table, args, accept_encoding=''):
+    """(byte chunk iterator, mimetype, headers) for an export of table"""
+    if table not in EXPORT_TABLES:
+        raise ApiError(404, {"error": f"Unknown table: {table}", "tables": sorted(EXPORT_TABLES)})
+    
+    export_format = args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        raise ApiError(400, {"error": "format must be ndjson or csv"})
+    
+    time_column = EXPORT_TABLES[table]
+    start = args.get('start')
+    end = args.get('end')
+    include_archive = args.get('archive', '1') != '0'
+    
+    conditions = []
+    params = []
+    if time_column and start:
+        conditions.append(f'{time_column} >= ?')
+        params.append(start)
+    if time_column and end:
+        conditions.append(f'{time_column} < ?')
+        params.append(end)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    order = f"ORDER BY {time_column}" if time_column else "ORDER BY rowid"
+    
+    # A dedicated connection, so the long read doesn't tie up the thread's pooled one
+    conn = db_pool.open()
+    try:
+        conn.row_factory = None
+        cursor = conn.execute(f'SELECT * FROM {table} {where} {order}', params)
+        columns = [column[0] for column in cursor.description]
+    except BaseException:
+        # encode() only takes ownership of the connection once this succeeds
+        conn.close()
+        raise
+    
+    def rows():
+        # Older rows moved out of SQLite by archive.py come first
+        if include_archive and table in ARCHIVED_TABLES:
+            batch = []
+            for row in snapshot_archive.read(table, start, end):
+                batch.append(tuple(row.get(name) for name in columns))
+                if len(batch) >= EXPORT_BATCH_SIZE:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        while True:
+            batch = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not batch:
+                break
+            yield batch
+    
+    def encode():
+        try:
+            if export_format == 'csv':
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(columns)
+                for batch in rows():
+                    writer.writerows(batch)
+                    yield buffer.getvalue().encode()
+                    buffer.seek(0)
+                    buffer.truncate()
+                if buffer.tell():
+                    yield buffer.getvalue().encode()
+            else:
+                for batch in rows():
+                    yield ''.join(json.dumps(dict(zip(columns, row))) + '\n' for row in batch).encode()
+        finally:
+            conn.close()
+    
+    body = encode()
+    headers = {'Content-Disposition': f'attachment; filename={table}.{export_format}'}
+    if 'gzip' in accept_encoding:
+        body = gzip_stream(body)
+        headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
+    
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    return body, mimetype, headers
+
+def gzip_stream(chunks):
+    """Gzip-compress an iterable of byte chunks on the fly"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        chunks.close()
+
 @app.route('/api/character-extended', methods=['GET'])
 def get_character_extended():
-    """Get extended character data for terminal UI"""
+    """Get extended character data for terminal UI (?fields=stats,quests for a subset)"""
+    fields = [name for name in request.args.get('fields', '').split(',') if name]
+    unknown = [name for name in fields if name not in EXTENDED_SECTIONS]
+    if unknown:
+        return jsonify({
+            "error": f"Unknown fields: {', '.join(unknown)}",
+            "fields": list(EXTENDED_SECTIONS)
+        }), 400
+    
     try:
-        # Check for cached extended data file
-        extended_file = GAME_DATA_DIR / "character_extended.json"
-        
-        if extended_file.exists():
-            # Return cached data if recent (less than 10 seconds old)
-            import os
-            if (datetime.now().timestamp() - os.path.getmtime(extended_file)) < 10:
-                with open(extended_file, 'r') as f:
-                    return jsonify(json.load(f))
-        
-        # Generate new extended data
-        generator = CharacterDataGenerator(str(GAME_DATA_DIR))
-        extended_data = generator.generate_extended_data()
-        
-        # Cache it
-        with open(extended_file, 'w') as f:
-            json.dump(extended_data, f, indent=2)
-        
+        # Sections are cached in memory until the game files change; the
+        # generator's lock makes concurrent misses wait for a single rebuild
+        extended_data = generator.generate_extended_data(fields)
         return jsonify(extended_data)
     
     except Exception as e:
@@ -311,9 +648,7 @@ def get_character_extended():
 def get_timeline():
     """Get timeline events"""
     try:
-        generator = CharacterDataGenerator(str(GAME_DATA_DIR))
-        base_data = generator.load_base_game_data()
-        timeline = generator._generate_timeline(base_data)
+        timeline = generator.section('timeline')
         return jsonify(timeline)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -322,9 +657,7 @@ def get_timeline():
 def get_quests():
     """Get quest log"""
     try:
-        generator = CharacterDataGenerator(str(GAME_DATA_DIR))
-        base_data = generator.load_base_game_data()
-        quests = generator._generate_quests(base_data)
+        quests = generator.section('quests')
         return jsonify({"quests": quests})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -333,10 +666,8 @@ def get_quests():
 def get_locations_extended():
     """Get extended location data"""
     try:
-        generator = CharacterDataGenerator(str(GAME_DATA_DIR))
-        base_data = generator.load_base_game_data()
-        locations = generator._generate_locations(base_data)
-        map_data = generator._generate_map_data(base_data)
+        locations = generator.section('locations')
+        map_data = generator.section('map')
         return jsonify({
             "locations": locations,
             "map": map_data
@@ -348,9 +679,7 @@ def get_locations_extended():
 def get_journal():
     """Get journal entries"""
     try:
-        generator = CharacterDataGenerator(str(GAME_DATA_DIR))
-        base_data = generator.load_base_game_data()
-        journal = generator._generate_journal(base_data)
+        journal = generator.section('journal')
         return jsonify({"journal": journal})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -362,8 +691,16 @@ if __name__ == '__main__':
     parser.add_argument("--port", type=int, default=5000, help="Port to run server on")
     parser.add_argument("--host", default="0.0.0.0", help="Host to bind to")
     parser.add_argument("--debug", action="store_true", help="Run in debug mode")
+    parser.add_argument("--slow-query-ms", type=float, default=100.0,
+                        help="Log EXPLAIN QUERY PLAN for SQL statements slower than this")
+    parser.add_argument("--db-path", default=DB_PATH, help="Path to SQLite database")
+    parser.add_argument("--replica-dir", default=None,
+                        help="Read the newest replica published by the collector instead of the live database")
     
     args = parser.parse_args()
+    api_metrics.slow_query_seconds = args.slow_query_ms / 1000
+    db_pool.db_path = args.db_path
+    db_pool.replica_dir = args.replica_dir
     
     print(f"Starting API server on {args.host}:{args.port}")
     app.run(host=args.host, port=args.port, debug=args.debug)
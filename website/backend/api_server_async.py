@@ -0,0 +1,308 @@
+"""
+Async API Server for Website
+
+The same routes as api_server.py on an ASGI app (Starlette under uvicorn), for
+deployments with many concurrent viewers. The event loop only handles sockets:
+SQLite reads, game-file parsing and export encoding run on a bounded thread
+pool, and requests beyond the pool plus its waiting line get 503 instead of
+piling up. Live feed clients wait on the loop and hold no thread at all.
+
+Resources, paging, batch, export and the live feed are shared with
+api_server.py; only the HTTP layer differs.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from email.utils import format_datetime
+
+from starlette.applications import Starlette
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from werkzeug.datastructures import MultiDict
+
+import api_server as api
+from character_data_generator import EXTENDED_SECTIONS
+from response_cache import ResponseCache
+
+DB_WORKERS = 16
+MAX_WAITING = 256
+
+
+class Offload:
+    """Bounded thread pool for blocking work, refusing calls once its queue is full"""
+
+    def __init__(self, workers: int = DB_WORKERS, max_waiting: int = MAX_WAITING):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-db")
+        self.capacity = workers + max_waiting
+        self.pending = 0  # Only touched on the event loop
+
+    async def run(self, fn, *args):
+        if self.pending >= self.capacity:
+            raise api.ApiError(503, {"error": "Server busy", "message": "Try again shortly"})
+        return await self.submit(fn, *args)
+
+    async def submit(self, fn, *args):
+        """Run without the capacity check, for work that was already admitted"""
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, _in_worker, fn, args)
+        finally:
+            self.pending -= 1
+
+    async def iterate(self, chunks):
+        """Async iterator over an admitted blocking iterator, one next() per worker call"""
+        try:
+            # No capacity check: a response already started is never cut off with a 503
+            while True:
+                chunk = await self.submit(next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            await asyncio.get_running_loop().run_in_executor(self.executor, chunks.close)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _in_worker(fn, args):
+    try:
+        return fn(*args)
+    except sqlite3.DatabaseError:
+        # Connections are per thread: drop this worker's so its next call reconnects
+        api.db_pool.discard()
+        raise
+
+
+@asynccontextmanager
+async def lifespan(app):
+    app.state.offload = Offload(app.state.db_workers, app.state.max_waiting)
+    app.state.cache = ResponseCache()
+    logging.info(f"API workers: {app.state.db_workers}, waiting line: {app.state.max_waiting}")
+    try:
+        yield
+    finally:
+        app.state.offload.shutdown()
+        api.db_pool.close_all()
+        logging.info("API server stopped")
+
+
+def json_response(body, status=200, headers=None):
+    return Response(_dumps(body), status_code=status, headers=headers, media_type='application/json')
+
+
+def _dumps(body) -> bytes:
+    return json.dumps(body, sort_keys=True, separators=(',', ':'), default=str).encode()
+
+
+def query_args(request: Request) -> MultiDict:
+    """Query string as the MultiDict resources expect (args.get(..., type=int))"""
+    return MultiDict(list(request.query_params.multi_items()))
+
+
+async def cached_json(request: Request, produce):
+    """Serve produce() -> (body, headers) from the response cache until the next commit"""
+    cache = request.app.state.cache
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+
+    def render():
+        version = cache.data_version(api.get_db())
+        entry = cache.get(key, version) if version is not None else None
+        if entry is None:
+            body, headers = produce()
+            headers = {'Content-Type': 'application/json', **headers}
+            if version is None:
+                return None, _dumps(body), headers  # Collector doesn't version its commits
+            entry = cache.put(key, version, _dumps(body), 200, headers)
+        return entry, entry.body, dict(entry.headers)
+
+    entry, data, headers = await request.app.state.offload.run(render)
+    if entry is None:
+        return Response(data, headers=headers)
+
+    headers['ETag'] = f'"{entry.etag}"'
+    headers['Cache-Control'] = 'no-cache'
+    if entry.last_modified:
+        headers['Last-Modified'] = format_datetime(entry.last_modified, usegmt=True)
+    if headers['ETag'] in request.headers.get('if-none-match', ''):
+        return Response(status_code=304, headers={name: headers[name] for name in
+                                                  ('ETag', 'Cache-Control', 'Last-Modified') if name in headers})
+    return Response(data, headers=headers)
+
+
+async def get_resource(request: Request):
+    name = request.path_params['name']
+    if name not in api.RESOURCES:
+        return json_response({"error": "Not found"}, 404)
+    args = query_args(request)
+
+    def produce():
+        headers = {}
+        with api.read_snapshot(api.get_db()) as cursor:
+            body = api.RESOURCES[name](cursor, args, headers)
+        return body, headers
+
+    return await cached_json(request, produce)
+
+
+async def get_batch(request: Request):
+    """Several resources from one read transaction, see api_server.get_batch"""
+    if request.method == 'POST':
+        try:
+            payload = await request.json()
+        except ValueError:
+            payload = None
+        requested = api.batch_from_json(payload)
+        return json_response(await request.app.state.offload.run(api.run_batch, requested))
+
+    requested = api.batch_from_args(query_args(request))
+    return await cached_json(request, lambda: (api.run_batch(requested), {}))
+
+
+async def health_check(request: Request):
+    def count():
+        return api.get_db().execute('SELECT COUNT(*) FROM game_states').fetchone()[0]
+
+    try:
+        total = await request.app.state.offload.run(count)
+    except api.ApiError:
+        raise
+    except Exception as e:
+        return json_response({"status": "unhealthy", "error": str(e)}, 500)
+    return json_response({"status": "healthy", "database": "connected", "total_states": total})
+
+
+async def live_events(request: Request):
+    """Server-Sent Events feed; clients wait on the event loop, not on a thread"""
+    last_event_id = request.headers.get('last-event-id') or request.query_params.get('last_event_id')
+    return StreamingResponse(
+        (chunk.encode() async for chunk in api.live_feed.stream_async(last_event_id)),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+async def export_table(request: Request):
+    offload = request.app.state.offload
+    body, mimetype, headers = await offload.run(
+        api.export_stream, request.path_params['table'], query_args(request),
+        request.headers.get('accept-encoding', ''))
+    return StreamingResponse(offload.iterate(body), media_type=mimetype, headers=headers)
+
+
+async def get_character_extended(request: Request):
+    """Extended character data for the terminal UI (?fields=stats,quests for a subset)"""
+    fields = [name for name in request.query_params.get('fields', '').split(',') if name]
+    unknown = [name for name in fields if name not in EXTENDED_SECTIONS]
+    if unknown:
+        return json_response({
+            "error": f"Unknown fields: {', '.join(unknown)}",
+            "fields": list(EXTENDED_SECTIONS)
+        }, 400)
+
+    try:
+        return json_response(await request.app.state.offload.run(api.generator.generate_extended_data, fields))
+    except api.ApiError:
+        raise
+    except Exception as e:
+        return json_response({"error": str(e), "message": "Error generating extended character data"}, 500)
+
+
+def section_route(build):
+    """Route serving build(generator) from the generator's section cache"""
+    async def endpoint(request: Request):
+        try:
+            return json_response(await request.app.state.offload.run(build, api.generator))
+        except api.ApiError:
+            raise
+        except Exception as e:
+            return json_response({"error": str(e)}, 500)
+    return endpoint
+
+
+async def handle_api_error(request: Request, e: api.ApiError):
+    return JSONResponse(e.payload, status_code=e.status)
+
+
+async def handle_database_error(request: Request, e: sqlite3.DatabaseError):
+    return JSONResponse({"error": str(e), "message": "Database unavailable"}, status_code=503)
+
+
+routes = [
+    Route('/api/batch', get_batch, methods=['GET', 'POST']),
+    Route('/api/health', health_check),
+    Route('/api/live', live_events),
+    Route('/api/export/{table}', export_table),
+    Route('/api/character-extended', get_character_extended),
+    Route('/api/timeline', section_route(lambda generator: generator.section('timeline'))),
+    Route('/api/quests', section_route(lambda generator: {"quests": generator.section('quests')})),
+    Route('/api/locations-extended', section_route(lambda generator: {
+        "locations": generator.section('locations'),
+        "map": generator.section('map')
+    })),
+    Route('/api/journal', section_route(lambda generator: {"journal": generator.section('journal')})),
+    # Database-backed resources registered in api_server.py
+    Route('/api/{name}', get_resource),
+]
+
+
+def create_app(db_workers: int = DB_WORKERS, max_waiting: int = MAX_WAITING) -> Starlette:
+    app = Starlette(
+        routes=routes,
+        lifespan=lifespan,
+        exception_handlers={
+            api.ApiError: handle_api_error,
+            sqlite3.DatabaseError: handle_database_error,
+        },
+    )
+    app.state.db_workers = db_workers
+    app.state.max_waiting = max_waiting
+    app.add_middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+    return app
+
+
+app = create_app()
+
+if __name__ == '__main__':
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fallout 1 Website API Server (ASGI)")
+    parser.add_argument("--port", type=int, default=5000, help="Port to run server on")
+    parser.add_argument("--host", default="0.0.0.0", help="Host to bind to")
+    parser.add_argument("--db-workers", type=int, default=DB_WORKERS,
+                        help="Threads for database and file work")
+    parser.add_argument("--max-waiting", type=int, default=MAX_WAITING,
+                        help="Requests allowed to wait for a worker before 503")
+    parser.add_argument("--limit-concurrency", type=int, default=5000,
+                        help="Open connections (including live feeds) before new ones get 503")
+    parser.add_argument("--backlog", type=int, default=2048, help="Listen socket backlog")
+    parser.add_argument("--graceful-timeout", type=int, default=10,
+                        help="Seconds to let open requests finish on shutdown")
+    parser.add_argument("--slow-query-ms", type=float, default=100.0,
+                        help="Log EXPLAIN QUERY PLAN for SQL statements slower than this")
+    parser.add_argument("--db-path", default=api.DB_PATH, help="Path to SQLite database")
+    parser.add_argument("--replica-dir", default=None,
+                        help="Read the newest replica published by the collector instead of the live database")
+
+    args = parser.parse_args()
+    api.api_metrics.slow_query_seconds = args.slow_query_ms / 1000
+    api.db_pool.db_path = args.db_path
+    api.db_pool.replica_dir = args.replica_dir
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    print(f"Starting async API server on {args.host}:{args.port}")
+    uvicorn.run(
+        create_app(args.db_workers, args.max_waiting),
+        host=args.host,
+        port=args.port,
+        limit_concurrency=args.limit_concurrency,
+        backlog=args.backlog,
+        timeout_graceful_shutdown=args.graceful_timeout,
+    )
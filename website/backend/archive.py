@@ -0,0 +1,212 @@
+"""
+Snapshot Archive
+
+Moves aged per-second history out of game_data.db into compressed columnar
+segment files, so the live database stays small enough to sit in the page cache
+while months of runs remain queryable for season recaps.
+
+Layout: <archive_dir>/<table>/<YYYY-MM-DD>.<first_id>-<last_id>.jsonl.gz
+
+Each segment is a gzip stream of JSON lines; every line is one row group holding
+up to ROW_GROUP_SIZE rows stored column-wise ({"columns": [...], "data": {...}}).
+Parquet or NumPy would need dependencies the backend doesn't have, and row groups
+keep both writing and reading streaming-friendly for days with millions of rows.
+
+Usage:
+    python archive.py --older-than-days 30
+    python archive.py --list
+    python archive.py --read game_states --start "2025-01-01" --end "2025-01-02"
+"""
+
+import gzip
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# Per-second tables that grow without bound; rollups and event tables stay live
+ARCHIVED_TABLES = ['game_states', 'inventory_snapshots', 'skills', 'session_stats']
+
+ROW_GROUP_SIZE = 50000
+
+
+class SnapshotArchive:
+    """Writes and reads archived history segments"""
+
+    def __init__(self, archive_dir: str = "./database/archive"):
+        self.archive_dir = Path(archive_dir)
+
+    def segments(self, table: str, day: Optional[str] = None) -> List[Path]:
+        """Segment files for a table (optionally one day), oldest first"""
+        table_dir = self.archive_dir / table
+        if not table_dir.is_dir():
+            return []
+        pattern = f"{day}.*.jsonl.gz" if day else "*.jsonl.gz"
+        return sorted(table_dir.glob(pattern), key=_segment_sort_key)
+
+    def days(self, table: str) -> List[str]:
+        """Days with archived rows for a table"""
+        return sorted({path.name.split('.', 1)[0] for path in self.segments(table)})
+
+    def archive(self, conn: sqlite3.Connection, older_than_days: float) -> Dict[str, int]:
+        """Move whole days older than the cutoff from SQLite into segments"""
+        moved = {}
+        cursor = conn.cursor()
+
+        for table in ARCHIVED_TABLES:
+            cursor.execute(f'''
+                SELECT DISTINCT DATE(timestamp) FROM {table}
+                WHERE timestamp < DATE('now', ?)
+                ORDER BY 1
+            ''', (f"-{float(older_than_days):f} days",))
+            days = [row[0] for row in cursor.fetchall() if row[0]]
+
+            moved[table] = 0
+            for day in days:
+                moved[table] += self._archive_day(conn, table, day)
+
+        return moved
+
+    def _archive_day(self, conn: sqlite3.Connection, table: str, day: str) -> int:
+        day_range = (day, f"{day} 99")  # every 'YYYY-MM-DD HH:MM:SS' on that day
+
+        # Rows already written by an earlier run that died before deleting them
+        archived_up_to = max((_segment_id_range(path)[1] for path in self.segments(table, day)), default=0)
+
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT * FROM {table}
+            WHERE timestamp >= ? AND timestamp < ? AND id > ?
+            ORDER BY id
+        ''', (*day_range, archived_up_to))
+        columns = [column[0] for column in cursor.description]
+
+        table_dir = self.archive_dir / table
+        table_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = table_dir / f"{day}.tmp"
+
+        first_id = last_id = None
+        count = 0
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            while True:
+                rows = cursor.fetchmany(ROW_GROUP_SIZE)
+                if not rows:
+                    break
+                if first_id is None:
+                    first_id = rows[0][0]
+                last_id = rows[-1][0]
+                count += len(rows)
+                group = {name: [row[i] for row in rows] for i, name in enumerate(columns)}
+                f.write(json.dumps({"columns": columns, "data": group}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        if count:
+            os.replace(tmp_path, table_dir / f"{day}.{first_id}-{last_id}.jsonl.gz")
+        else:
+            tmp_path.unlink()
+            last_id = archived_up_to
+
+        # Only delete once the segment is safely on disk
+        conn.execute('BEGIN')
+        try:
+            deleted = conn.execute(f'''
+                DELETE FROM {table}
+                WHERE timestamp >= ? AND timestamp < ? AND id <= ?
+            ''', (*day_range, last_id)).rowcount
+            if deleted:
+                bump_data_version(conn)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+        if count:
+            logging.info(f"Archived {count} {table} rows for {day}")
+        return count
+
+    def read(self, table: str, start: Optional[str] = None, end: Optional[str] = None) -> Iterator[Dict]:
+        """Archived rows for a table with start <= timestamp < end, in id order"""
+        for path in self.segments(table):
+            day = path.name.split('.', 1)[0]
+            if start and day < start[:10]:
+                continue
+            if end and day > end[:10]:
+                continue
+
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    group = json.loads(line)
+                    columns = group["columns"]
+                    data = group["data"]
+                    for values in zip(*(data[name] for name in columns)):
+                        row = dict(zip(columns, values))
+                        timestamp = row.get('timestamp') or ''
+                        if start and timestamp < start:
+                            continue
+                        if end and timestamp >= end:
+                            continue
+                        yield row
+
+
+def bump_data_version(conn: sqlite3.Connection):
+    """Advance the version the API's response cache is keyed on, as the collector does"""
+    conn.execute('''
+        INSERT INTO collector_meta (key, value) VALUES ('data_version', '1')
+        ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+    ''')
+    conn.execute('''
+        INSERT INTO collector_meta (key, value) VALUES ('data_modified', ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+    ''', (datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),))
+
+
+def _segment_id_range(path: Path):
+    first, last = path.name.split('.')[1].split('-')
+    return int(first), int(last)
+
+
+def _segment_sort_key(path: Path):
+    return (path.name.split('.', 1)[0], _segment_id_range(path)[0])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Archive old game history out of SQLite")
+    parser.add_argument("--db-path", default="./database/game_data.db", help="Path to SQLite database")
+    parser.add_argument("--archive-dir", default="./database/archive", help="Directory for archive segments")
+    parser.add_argument("--older-than-days", type=float, default=30, help="Archive whole days older than this")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the database after archiving")
+    parser.add_argument("--list", action="store_true", help="List archived days per table")
+    parser.add_argument("--read", metavar="TABLE", help="Print archived rows of a table as JSON lines")
+    parser.add_argument("--start", help="With --read: first timestamp to include")
+    parser.add_argument("--end", help="With --read: timestamp to stop before")
+
+    args = parser.parse_args()
+
+    snapshot_archive = SnapshotArchive(args.archive_dir)
+
+    if args.list:
+        for table in ARCHIVED_TABLES:
+            days = snapshot_archive.days(table)
+            print(f"{table}: {len(days)} days" + (f" ({days[0]} .. {days[-1]})" if days else ""))
+
+    elif args.read:
+        for row in snapshot_archive.read(args.read, args.start, args.end):
+            print(json.dumps(row))
+
+    else:
+        conn = sqlite3.connect(args.db_path, timeout=30.0, isolation_level=None)
+        conn.execute('PRAGMA journal_mode = WAL')
+        moved = snapshot_archive.archive(conn, args.older_than_days)
+        for table, count in moved.items():
+            print(f"  {table}: {count} rows archived")
+        if args.vacuum:
+            conn.execute('VACUUM')
+        conn.close()
@@ -0,0 +1,216 @@
+"""
+Bulk Backfill Importer
+
+Loads directories of archived ai_state.json / character_data.json / ai_memory.json
+captures into game_data.db using GameDataCollector's storage methods. Files are
+parsed in a process pool and written in capture-time order through a single
+connection, in large transactions, with secondary indexes dropped until the end.
+
+Capture time comes from the path (a unix timestamp or YYYYMMDD[-_T]HHMMSS /
+YYYY-MM-DD[T_ ]HH-MM-SS anywhere in it), falling back to the file's mtime.
+
+Usage:
+    python backfill.py /captures/run1 /captures/run2 --db-path ./database/game_data.db
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from data_collector import GameDataCollector
+
+CAPTURE_KINDS = ('ai_state', 'character_data', 'ai_memory')
+
+_DATETIME_PATTERN = re.compile(r'(\d{4})-?(\d{2})-?(\d{2})[-_T ]?(\d{2})[-:]?(\d{2})[-:]?(\d{2})')
+_EPOCH_PATTERN = re.compile(r'(?<!\d)(1\d{9})(?!\d)')
+
+
+def capture_time(path: Path) -> datetime:
+    """Best guess at when a capture was taken, as naive UTC"""
+    text = str(path)
+
+    match = _DATETIME_PATTERN.search(text)
+    if match:
+        try:
+            return datetime(*(int(part) for part in match.groups()))
+        except ValueError:
+            pass
+
+    match = _EPOCH_PATTERN.search(text)
+    seconds = int(match.group(1)) if match else os.path.getmtime(path)
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+
+
+def capture_kind(path: Path) -> Optional[str]:
+    """Which export a file is, from its name (e.g. ai_state_1700000000.json)"""
+    if path.suffix != '.json':
+        return None
+    for kind in CAPTURE_KINDS:
+        if path.name.startswith(kind):
+            return kind
+    return None
+
+
+def find_captures(directories: Iterable[str]) -> List[Tuple[str, str, str]]:
+    """(timestamp, kind, path) for every capture, oldest first"""
+    captures = []
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = Path(root) / name
+                kind = capture_kind(path)
+                if kind:
+                    timestamp = capture_time(path).strftime('%Y-%m-%d %H:%M:%S')
+                    captures.append((timestamp, kind, str(path)))
+
+    # Within one capture instant, state before character data before memory
+    captures.sort(key=lambda capture: (capture[0], CAPTURE_KINDS.index(capture[1]), capture[2]))
+    return captures
+
+
+def parse_captures(captures: List[Tuple[str, str, str]]):
+    """Worker: load a chunk of capture files (runs in the process pool)"""
+    parsed = []
+    for timestamp, kind, path in captures:
+        try:
+            with open(path, 'rb') as f:
+                parsed.append((timestamp, kind, path, json.loads(f.read()), None))
+        except (OSError, ValueError) as e:
+            parsed.append((timestamp, kind, path, None, str(e)))
+    return parsed
+
+
+def parse_in_order(pool: ProcessPoolExecutor, captures: list, chunk_size: int = 256, max_pending: int = 64):
+    """Yield parsed captures in input order, keeping a bounded number of chunks in flight"""
+    pending = deque()
+    for start in range(0, len(captures), chunk_size):
+        pending.append(pool.submit(parse_captures, captures[start:start + chunk_size]))
+        if len(pending) >= max_pending:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+
+def storage_mode(db_path: str) -> Optional[str]:
+    """storage_mode recorded by the collector, if the database exists"""
+    if not os.path.exists(db_path):
+        return None
+    with closing(sqlite3.connect(db_path)) as conn:
+        try:
+            row = conn.execute("SELECT value FROM collector_meta WHERE key = 'storage_mode'").fetchone()
+        except sqlite3.OperationalError:
+            return None
+    return row[0] if row else None
+
+
+class BackfillImporter:
+    """Writes parsed captures through one GameDataCollector connection"""
+
+    def __init__(self, db_path: str, batch_size: int = 5000, workers: int = None):
+        # Delta chains are ordered by id, so old captures can't be appended after live ones
+        if storage_mode(db_path) == 'delta':
+            raise RuntimeError("Backfill writes full snapshots; import into a database "
+                               "that isn't collected with --delta")
+
+        self.collector = GameDataCollector(".", db_path)
+        self.batch_size = batch_size
+        self.workers = workers
+
+    def run(self, directories: Iterable[str]):
+        captures = find_captures(directories)
+        logging.info(f"Found {len(captures)} capture files")
+        if not captures:
+            return
+
+        conn = self.collector.conn
+        cursor = conn.cursor()
+
+        # The live collector's ai_memory.json high-water mark is restored afterwards
+        live_memory_cursor = self.collector.get_meta('memory_cursor')
+        self.collector.memory_cursor = None
+
+        conn.execute('PRAGMA synchronous = OFF')
+        conn.execute('BEGIN')
+        self.collector.drop_indexes(cursor)
+        conn.execute('COMMIT')
+
+        started = time.monotonic()
+        changes_before = conn.total_changes
+        imported = failed = 0
+        last_report = started
+
+        store = {
+            'ai_state': lambda data, timestamp: self.collector.store_game_state(cursor, data, timestamp),
+            'character_data': lambda data, timestamp: self.collector.store_character_data(cursor, data),
+            'ai_memory': lambda data, timestamp: self.collector.store_memory(cursor, data),
+        }
+
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                conn.execute('BEGIN')
+                for timestamp, kind, path, data, error in parse_in_order(pool, captures):
+                    if error:
+                        logging.warning(f"Skipping {path}: {error}")
+                        failed += 1
+                        continue
+
+                    store[kind](data, timestamp)
+                    imported += 1
+
+                    if imported % self.batch_size == 0:
+                        self.collector.bump_data_version()
+                        conn.execute('COMMIT')
+                        conn.execute('BEGIN')
+
+                    if time.monotonic() - last_report >= 5:
+                        last_report = time.monotonic()
+                        self.report(imported, conn.total_changes - changes_before, started)
+
+                self.collector.set_meta('memory_cursor', live_memory_cursor or '')
+                self.collector.bump_data_version()
+                conn.execute('COMMIT')
+        finally:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+
+            logging.info("Rebuilding indexes...")
+            conn.execute('BEGIN')
+            self.collector.create_indexes(cursor)
+            conn.execute('COMMIT')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            conn.execute('ANALYZE')
+
+        self.report(imported, conn.total_changes - changes_before, started)
+        if failed:
+            logging.warning(f"{failed} capture files could not be parsed")
+
+    @staticmethod
+    def report(imported: int, rows: int, started: float):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        logging.info(f"Imported {imported} captures, {rows} rows in {elapsed:.1f}s "
+                     f"({imported / elapsed * 60:.0f} captures/min, {rows / elapsed:.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk-import archived game JSON captures")
+    parser.add_argument("directories", nargs="+", help="Directories containing capture files")
+    parser.add_argument("--db-path", default="./database/game_data.db", help="Path to SQLite database")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Captures per transaction")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+
+    args = parser.parse_args()
+
+    importer = BackfillImporter(args.db_path, args.batch_size, args.workers)
+    importer.run(args.directories)
+    importer.collector.close()
@@ -6,9 +6,11 @@ This module extends the basic game state with features needed for the stream com
 """
 
 import json
+import os
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 
 # Import quest database for wiki-based quest information
 from quest_database import (
@@ -17,6 +19,16 @@ from quest_database import (
     QUEST_CATEGORIES
 )
 
+# Game exports the generated data is derived from
+INPUT_FILES = ("ai_state.json", "character_data.json", "ai_memory.json")
+
+# Top-level keys of generate_extended_data(), in output order
+EXTENDED_SECTIONS = (
+    "character", "visuals", "stats", "special", "skills", "perks", "traits", "inventory",
+    "quests", "journal", "relations", "currentLocation", "map", "locations", "timeline",
+    "streamHighlights",
+)
+
 class CharacterDataGenerator:
     """Generates extended character data for frontend"""
     
@@ -29,6 +41,59 @@ class CharacterDataGenerator:
         self.location_events = {}
         self.faction_reputation = {}
         
+        # Parsed inputs and generated sections, reused until an input file changes
+        self.cache_lock = threading.Lock()
+        self.cache_signature = None
+        self.cached_base_data = None
+        self.cached_sections = {}
+    
+    def input_signature(self) -> Tuple[Optional[Tuple[int, int]], ...]:
+        """(mtime_ns, size) of each input file, None for missing ones"""
+        signature = []
+        for name in INPUT_FILES:
+            try:
+                st = os.stat(self.game_data_dir / name)
+                signature.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+    
+    def section(self, name: str) -> Any:
+        """One section of the extended data, regenerated only when an input changed"""
+        with self.cache_lock:
+            # Stat before reading, so a write during the read is seen next time
+            signature = self.input_signature()
+            if signature != self.cache_signature:
+                self.cached_base_data = self.load_base_game_data()
+                self.cached_sections = {}
+                self.cache_signature = signature
+            
+            if name not in self.cached_sections:
+                base_data = self.cached_base_data
+                self.cached_sections[name] = self._section_builders()[name](base_data, base_data.get('state', {}))
+            return self.cached_sections[name]
+    
+    def _section_builders(self):
+        """Extended data key -> builder(base_data, state)"""
+        return {
+            "character": lambda base_data, state: self._generate_character_info(state),
+            "visuals": lambda base_data, state: self._generate_visual_data(),
+            "stats": lambda base_data, state: self._generate_stats(state),
+            "special": lambda base_data, state: self._extract_special(state),
+            "skills": lambda base_data, state: self._generate_skills(state),
+            "perks": lambda base_data, state: self._extract_perks(state),
+            "traits": lambda base_data, state: self._generate_traits(),
+            "inventory": lambda base_data, state: self._generate_inventory(state),
+            "quests": lambda base_data, state: self._generate_quests(base_data),
+            "journal": lambda base_data, state: self._generate_journal(base_data),
+            "relations": lambda base_data, state: self._generate_relations(),
+            "currentLocation": lambda base_data, state: state.get('map_name', 'Unknown'),
+            "map": lambda base_data, state: self._generate_map_data(base_data),
+            "locations": lambda base_data, state: self._generate_locations(base_data),
+            "timeline": lambda base_data, state: self._generate_timeline(base_data),
+            "streamHighlights": lambda base_data, state: self._generate_highlights(state),
+        }
+        
     def load_base_game_data(self) -> Dict[str, Any]:
         """Load existing game data from JSON files"""
         base_data = {}
@@ -82,29 +147,9 @@ class CharacterDataGenerator:
             'inventory': []
         }
     
-    def generate_extended_data(self) -> Dict[str, Any]:
-        """Generate complete extended character data"""
-        base_data = self.load_base_game_data()
-        state = base_data.get('state', {})
-        
-        extended_data = {
-            "character": self._generate_character_info(state),
-            "visuals": self._generate_visual_data(),
-            "stats": self._generate_stats(state),
-            "special": self._extract_special(state),
-            "skills": self._generate_skills(state),
-            "perks": self._extract_perks(state),
-            "traits": self._generate_traits(),
-            "inventory": self._generate_inventory(state),
-            "quests": self._generate_quests(base_data),
-            "journal": self._generate_journal(base_data),
-            "relations": self._generate_relations(),
-            "currentLocation": state.get('map_name', 'Unknown'),
-            "map": self._generate_map_data(base_data),
-            "locations": self._generate_locations(base_data),
-            "timeline": self._generate_timeline(base_data),
-            "streamHighlights": self._generate_highlights(state)
-        }
+    def generate_extended_data(self, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Generate extended character data (all sections, or only the given fields)"""
+        extended_data = {name: self.section(name) for name in (fields or EXTENDED_SECTIONS)}
         
         return extended_data
     
@@ -0,0 +1,223 @@
+"""
+Collector Self-Instrumentation
+
+Hot-path timings and counters for GameDataCollector: per-stage latency (file
+read, JSON parse, DB write, commit), rows written per table, files skipped as
+unchanged, lag between the game writing a file and its rows being committed,
+and database size. Exposed as Prometheus text (a textfile-collector file and/or
+a tiny HTTP endpoint) plus a periodic summary log line.
+"""
+
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def lines(self, name: str, labels: str) -> List[str]:
+        prefix = f'{labels},' if labels else ''
+        lines = [
+            f'{name}_bucket{{{prefix}le="{bound}"}} {count}'
+            for bound, count in zip(self.buckets, self.counts)
+        ]
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+class CollectorMetrics:
+    """Thread-safe metrics registry for one collector process"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+        self.stage_seconds: Dict[tuple, Histogram] = {}
+        self.lag_seconds: Dict[str, Histogram] = {}
+        self.rows_written: Dict[str, int] = {}
+        self.files_ingested: Dict[str, int] = {}
+        self.files_skipped: Dict[str, int] = {}
+        self.cycles = 0
+        self.errors = 0
+        self.last_commit = 0.0
+
+        # Deltas since the last summary line
+        self.window_started = time.monotonic()
+        self.window_cycles = 0
+        self.window_rows = 0
+
+    def observe_stage(self, stage: str, file: str, seconds: float):
+        with self.lock:
+            key = (stage, file)
+            if key not in self.stage_seconds:
+                self.stage_seconds[key] = Histogram(LATENCY_BUCKETS)
+            self.stage_seconds[key].observe(seconds)
+
+    def observe_lag(self, file: str, seconds: float):
+        with self.lock:
+            if file not in self.lag_seconds:
+                self.lag_seconds[file] = Histogram(LAG_BUCKETS)
+            self.lag_seconds[file].observe(max(seconds, 0.0))
+            self.files_ingested[file] = self.files_ingested.get(file, 0) + 1
+
+    def add_rows(self, table: str, count: int):
+        if count <= 0:
+            return
+        with self.lock:
+            self.rows_written[table] = self.rows_written.get(table, 0) + count
+            self.window_rows += count
+
+    def skipped(self, file: str):
+        with self.lock:
+            self.files_skipped[file] = self.files_skipped.get(file, 0) + 1
+
+    def cycle_done(self):
+        with self.lock:
+            self.cycles += 1
+            self.window_cycles += 1
+            self.last_commit = time.time()
+
+    def error(self):
+        with self.lock:
+            self.errors += 1
+
+    def db_size_bytes(self) -> int:
+        """Main database file plus its WAL"""
+        size = 0
+        for path in (self.db_path, self.db_path + '-wal'):
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                pass
+        return size
+
+    def render_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        db_size = self.db_size_bytes()
+        with self.lock:
+            lines = [
+                '# HELP collector_stage_seconds Time spent per collection stage',
+                '# TYPE collector_stage_seconds histogram',
+            ]
+            for (stage, file), histogram in sorted(self.stage_seconds.items()):
+                lines.extend(histogram.lines('collector_stage_seconds', f'stage="{stage}",file="{file}"'))
+
+            lines += [
+                '# HELP collector_ingest_lag_seconds File mtime to commit of its rows',
+                '# TYPE collector_ingest_lag_seconds histogram',
+            ]
+            for file, histogram in sorted(self.lag_seconds.items()):
+                lines.extend(histogram.lines('collector_ingest_lag_seconds', f'file="{file}"'))
+
+            lines += [
+                '# HELP collector_rows_written_total Rows inserted or updated per table',
+                '# TYPE collector_rows_written_total counter',
+            ]
+            lines += [f'collector_rows_written_total{{table="{table}"}} {count}'
+                      for table, count in sorted(self.rows_written.items())]
+
+            lines += [
+                '# HELP collector_files_ingested_total File versions ingested',
+                '# TYPE collector_files_ingested_total counter',
+            ]
+            lines += [f'collector_files_ingested_total{{file="{file}"}} {count}'
+                      for file, count in sorted(self.files_ingested.items())]
+
+            lines += [
+                '# HELP collector_files_skipped_total Reads skipped because the file was unchanged',
+                '# TYPE collector_files_skipped_total counter',
+            ]
+            lines += [f'collector_files_skipped_total{{file="{file}"}} {count}'
+                      for file, count in sorted(self.files_skipped.items())]
+
+            lines += [
+                '# TYPE collector_cycles_total counter',
+                f'collector_cycles_total {self.cycles}',
+                '# TYPE collector_errors_total counter',
+                f'collector_errors_total {self.errors}',
+                '# TYPE collector_last_commit_timestamp_seconds gauge',
+                f'collector_last_commit_timestamp_seconds {self.last_commit:.3f}',
+                '# TYPE collector_db_size_bytes gauge',
+                f'collector_db_size_bytes {db_size}',
+                '# TYPE collector_uptime_seconds gauge',
+                f'collector_uptime_seconds {time.time() - self.started:.0f}',
+            ]
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path: str):
+        """Atomically write metrics for node_exporter's textfile collector"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def summary(self) -> str:
+        """One-line digest of the window since the previous summary"""
+        db_size = self.db_size_bytes()
+        with self.lock:
+            elapsed = max(time.monotonic() - self.window_started, 1e-6)
+            parts = [
+                f"{self.window_cycles / elapsed:.2f} cycles/s",
+                f"{self.window_rows / elapsed:.1f} rows/s",
+            ]
+            for file, histogram in sorted(self.lag_seconds.items()):
+                if histogram.count:
+                    parts.append(f"{file} lag avg {histogram.sum / histogram.count:.3f}s max {histogram.max:.3f}s")
+            skipped = sum(self.files_skipped.values())
+            parts.append(f"{skipped} unchanged skips")
+            parts.append(f"db {db_size / (1024 * 1024):.1f} MB")
+
+            self.window_started = time.monotonic()
+            self.window_cycles = 0
+            self.window_rows = 0
+        return "Collector stats: " + ", ".join(parts)
+
+    def serve(self, port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+        """Serve /metrics from a daemon thread"""
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logging.info(f"Collector metrics on http://{host}:{port}/metrics")
+        return server
@@ -2,9 +2,11 @@
 Data Collector for Website
 
 Continuously monitors game JSON files and stores data in SQLite database.
-Runs as background service, polls every second.
+Runs as background service, polls every second or (with --watch) reacts to
+the game renaming fresh exports into place.
 """
 
+import hashlib
 import json
 import sqlite3
 import time
@@ -12,6 +14,14 @@ import os
 from datetime import datetime
 from pathlib import Path
 import logging
+from contextlib import contextmanager
+
+import map_visits
+import rollups
+from collector_metrics import CollectorMetrics
+from delta_store import DeltaEncoder
+from file_watcher import FileWatcher
+from replica_publisher import ReplicaPublisher
 
 # Configure logging
 logging.basicConfig(
@@ -23,25 +33,130 @@ logging.basicConfig(
     ]
 )
 
+# Bump when adding a migration step to GameDataCollector.migrate()
+SCHEMA_VERSION = 5
+
+# Dedup keys for history tables; ingest relies on INSERT OR IGNORE against these
+UNIQUE_INDEXES = [
+    ('idx_items_collected_unique', 'items_collected', 'item_pid, timestamp'),
+    ('idx_milestones_unique', 'milestones', 'description, timestamp'),
+    ('idx_decisions_unique', 'decisions', 'timestamp, action'),
+]
+
+# Secondary indexes for API queries (name, table, columns)
+INDEXES = [
+    ('idx_game_states_timestamp', 'game_states', 'timestamp'),
+    ('idx_inventory_snapshots_timestamp', 'inventory_snapshots', 'timestamp'),
+    ('idx_events_timestamp', 'events', 'timestamp'),
+    ('idx_milestones_timestamp', 'milestones', 'timestamp'),
+    ('idx_skills_timestamp', 'skills', 'timestamp'),
+    ('idx_stats_timestamp', 'stats', 'timestamp'),
+    ('idx_session_stats_timestamp', 'session_stats', 'timestamp'),
+    ('idx_items_collected_timestamp', 'items_collected', 'timestamp'),
+    ('idx_decisions_timestamp', 'decisions', 'timestamp'),
+    ('idx_map_visits_entered', 'map_visits', 'entered_at'),
+    ('idx_map_visits_map', 'map_visits', 'map_name, entered_at'),
+    # Covering indexes so a snapshot's child rows are one index range read
+    ('idx_inventory_snapshots_snapshot', 'inventory_snapshots', 'snapshot_id, item_pid, item_name, quantity'),
+    ('idx_skills_snapshot', 'skills', 'snapshot_id, skill_name, skill_value'),
+    ('idx_session_stats_snapshot', 'session_stats', 'snapshot_id'),
+    ('idx_inventory_changes_item', 'inventory_changes', 'item_pid, snapshot_id'),
+    ('idx_inventory_changes_timestamp', 'inventory_changes', 'timestamp'),
+    ('idx_skill_changes_skill', 'skill_changes', 'skill_name, snapshot_id'),
+    ('idx_skill_changes_timestamp', 'skill_changes', 'timestamp'),
+]
+
+def memory_entry_hash(entry: dict) -> str:
+    """Stable fingerprint of one ai_memory.json entry"""
+    return hashlib.sha1(json.dumps(entry, sort_keys=True).encode()).hexdigest()
+
 class GameDataCollector:
     """Collects data from game JSON files and stores in database"""
     
-    def __init__(self, game_dir: str = "../..", db_path: str = "./database/game_data.db"):
+    def __init__(self, game_dir: str = "../..", db_path: str = "./database/game_data.db",
+                 delta: bool = False, retention_days: float = None,
+                 metrics_file: str = None, summary_interval: float = 60.0,
+                 replica_dir: str = None, replica_interval: float = 10.0):
         self.game_dir = Path(game_dir)
         self.db_path = db_path
         self.running = False
         
+        # Raw game_states/session_stats older than this are pruned once rolled up
+        self.retention_days = retention_days
+        self.last_prune = None
+        
+        # Delta mode stores only changed inventory items and skills
+        self.delta = delta
+        self.delta_encoder = DeltaEncoder()
+        
+        # (mtime_ns, size, sha1) of the last version of each file we ingested
+        self.ingested_signatures = {}
+        self.pending_signatures = {}
+        
+        # Stage timings, row counts and ingest lag, see collector_metrics.py
+        self.metrics = CollectorMetrics(db_path)
+        self.uncommitted_mtimes = {}
+        self.metrics_file = metrics_file
+        self.metrics_file_interval = 10.0
+        self.summary_interval = summary_interval
+        self.last_metrics_write = self.last_summary = time.monotonic()
+        
+        # Publisher mode: read-only replicas for API processes, see replica_publisher.py
+        self.publisher = ReplicaPublisher(db_path, replica_dir, replica_interval) if replica_dir else None
+        
         # Ensure database directory exists
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         
+        # One long-lived connection; transactions are managed explicitly
+        self.conn = self.connect()
+        
         # Initialize database
         self.init_database()
+        self.set_meta('storage_mode', 'delta' if delta else 'full')
+        if delta:
+            self.delta_encoder.rehydrate(self.conn.cursor())
+        
+        # High-water mark into ai_memory.json, persisted in collector_meta
+        self.memory_cursor = self.load_memory_cursor()
         
-        logging.info(f"Data collector initialized. Game dir: {self.game_dir}, DB: {self.db_path}")
+        logging.info(f"Data collector initialized. Game dir: {self.game_dir}, DB: {self.db_path}, "
+                     f"storage: {'delta' if delta else 'full'}")
+    
+    def connect(self) -> sqlite3.Connection:
+        """Open the collector's write connection with WAL journaling"""
+        conn = sqlite3.connect(self.db_path, timeout=10.0, isolation_level=None)
+        conn.execute('PRAGMA journal_mode = WAL')
+        # WAL + NORMAL only fsyncs at checkpoints, not on every commit
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute('PRAGMA cache_size = -16000')  # 16 MB
+        conn.execute('PRAGMA temp_store = MEMORY')
+        return conn
+    
+    @contextmanager
+    def timed(self, stage: str, path: Path):
+        """Record how long a collection stage took for one file"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.metrics.observe_stage(stage, path.name, time.perf_counter() - started)
+    
+    @contextmanager
+    def savepoint(self, name: str = "collect"):
+        """Nest a collector's writes so a failure only discards its own rows"""
+        self.conn.execute(f'SAVEPOINT {name}')
+        try:
+            yield self.conn.cursor()
+        except BaseException:
+            self.conn.execute(f'ROLLBACK TO {name}')
+            self.conn.execute(f'RELEASE {name}')
+            raise
+        self.conn.execute(f'RELEASE {name}')
     
     def init_database(self):
         """Create database schema if it doesn't exist"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.conn
+        conn.execute('BEGIN')
         cursor = conn.cursor()
         
         # Game states table - snapshots of game state
@@ -70,6 +185,7 @@ class GameDataCollector:
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS inventory_snapshots (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                snapshot_id INTEGER REFERENCES game_states(id),
                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
                 item_pid INTEGER,
                 item_name TEXT,
@@ -116,6 +232,7 @@ class GameDataCollector:
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS skills (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                snapshot_id INTEGER REFERENCES game_states(id),
                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
                 skill_name TEXT,
                 skill_value INTEGER
@@ -136,6 +253,7 @@ class GameDataCollector:
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS session_stats (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                snapshot_id INTEGER REFERENCES game_states(id),
                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
                 total_kills INTEGER,
                 total_damage INTEGER,
@@ -155,191 +273,486 @@ class GameDataCollector:
             )
         ''')
         
-        conn.commit()
-        conn.close()
+        # Delta-encoded inventory (quantity 0 = removed) and skills, see delta_store.py
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS inventory_changes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                snapshot_id INTEGER REFERENCES game_states(id),
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                item_pid INTEGER,
+                item_name TEXT,
+                quantity INTEGER
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS skill_changes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                snapshot_id INTEGER REFERENCES game_states(id),
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                skill_name TEXT,
+                skill_value INTEGER
+            )
+        ''')
+        
+        # Per-minute/per-hour aggregates and run totals of game_states, see rollups.py
+        rollups.create_tables(cursor)
+        
+        # One row per continuous stay on a map, see map_visits.py
+        map_visits.create_table(cursor)
+        
+        # Collector settings and state shared with the API server
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS collector_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        
+        self.migrate(cursor)
+        
+        conn.execute('COMMIT')
         logging.info("Database schema initialized")
     
+    def migrate(self, cursor: sqlite3.Cursor):
+        """Upgrade an existing database in place to SCHEMA_VERSION"""
+        version = cursor.execute('PRAGMA user_version').fetchone()[0]
+        
+        if version < 1:
+            # Earlier collectors compared stored datetimes against raw unix
+            # timestamps, so the "already stored" checks never matched and
+            # every cycle re-inserted the full history. Keep the first copy.
+            for _, table, columns in UNIQUE_INDEXES:
+                removed = cursor.execute(f'''
+                    DELETE FROM {table} WHERE id NOT IN (
+                        SELECT MIN(id) FROM {table} GROUP BY {columns}
+                    )
+                ''').rowcount
+                if removed:
+                    logging.info(f"Removed {removed} duplicate rows from {table}")
+        
+        if version < 3:
+            for table in ('inventory_snapshots', 'skills', 'session_stats'):
+                columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
+                if 'snapshot_id' not in columns:
+                    cursor.execute(f'ALTER TABLE {table} ADD COLUMN snapshot_id INTEGER REFERENCES game_states(id)')
+        
+        # Before the backfills below, so their lookups are index seeks, not scans
+        self.create_indexes(cursor)
+        
+        if version < 2:
+            rollups.backfill(cursor)
+        
+        if version < 3:
+            # Link child rows to their game_states row instead of a 1-second
+            # timestamp; existing rows get the latest snapshot at or before them
+            for table in ('inventory_snapshots', 'skills', 'session_stats'):
+                cursor.execute(f'''
+                    UPDATE {table} SET snapshot_id = (
+                        SELECT id FROM game_states
+                        WHERE game_states.timestamp <= {table}.timestamp
+                        ORDER BY game_states.timestamp DESC, game_states.id DESC
+                        LIMIT 1
+                    )
+                    WHERE snapshot_id IS NULL
+                ''')
+        
+        if version < 4:
+            rollups.backfill_summary(cursor)
+        
+        if version < 5:
+            map_visits.backfill(cursor)
+        
+        if version < SCHEMA_VERSION:
+            cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            logging.info(f"Database schema upgraded from version {version} to {SCHEMA_VERSION}")
+    
+    def drop_indexes(self, cursor: sqlite3.Cursor):
+        """Drop the secondary indexes (dedup keys stay) ahead of a bulk load"""
+        for name, _, _ in INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS {name}')
+    
+    def create_indexes(self, cursor: sqlite3.Cursor, unique: bool = True, secondary: bool = True):
+        """Create any missing dedup and query indexes"""
+        if unique:
+            for name, table, columns in UNIQUE_INDEXES:
+                cursor.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {table} ({columns})')
+        if secondary:
+            for name, table, columns in INDEXES:
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})')
+    
+    def get_meta(self, key: str, default=None):
+        """Read a collector_meta value"""
+        row = self.conn.execute('SELECT value FROM collector_meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+    
+    def set_meta(self, key: str, value):
+        """Write a collector_meta value (joins the current transaction if any)"""
+        self.conn.execute('''
+            INSERT INTO collector_meta (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        ''', (key, str(value)))
+    
+    def bump_data_version(self):
+        """Advance the version the API's response cache is keyed on (joins the current transaction)"""
+        self.conn.execute('''
+            INSERT INTO collector_meta (key, value) VALUES ('data_version', '1')
+            ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+        ''')
+        self.set_meta('data_modified', datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'))
+    
+    def read_if_changed(self, path: Path):
+        """Parse a JSON export, or return None if it matches the last ingested version"""
+        try:
+            with self.timed('read', path):
+                st = os.stat(path)
+                with open(path, 'rb') as f:
+                    raw = f.read()
+                signature = (st.st_mtime_ns, st.st_size, hashlib.sha1(raw).digest())
+        except FileNotFoundError:
+            return None
+        
+        if self.ingested_signatures.get(path.name) == signature:
+            self.metrics.skipped(path.name)
+            return None
+        
+        with self.timed('parse', path):
+            data = json.loads(raw)
+        self.pending_signatures[path.name] = signature
+        return data
+    
+    def mark_ingested(self, path: Path):
+        """Remember the version of a file whose rows were just written"""
+        signature = self.pending_signatures.pop(path.name, None)
+        if signature is not None:
+            self.ingested_signatures[path.name] = signature
+            self.uncommitted_mtimes[path.name] = signature[0] / 1e9
+    
     def collect_game_state(self):
         """Read and store current game state"""
         state_file = self.game_dir / "ai_state.json"
         
-        if not state_file.exists():
-            return
-        
         try:
-            with open(state_file, 'r') as f:
-                data = json.load(f)
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            data = self.read_if_changed(state_file)
+            if data is None:
+                return
             
-            # Insert game state snapshot
-            cursor.execute('''
-                INSERT INTO game_states (
-                    hp_current, hp_max, ap_current, ap_max, level, experience,
-                    armor_class, map_name, tile, elevation, in_combat, session_time,
-                    last_action, last_action_result
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                data.get('hit_points', 0),
-                data.get('max_hit_points', 0),
-                data.get('action_points', 0),
-                data.get('max_action_points', 0),
-                data.get('level', 1),
-                data.get('experience', 0),
-                data.get('armor_class', 0),
-                data.get('map_name', 'Unknown'),
-                data.get('player_tile', 0),
-                data.get('player_elevation', 0),
-                data.get('in_combat', False),
-                data.get('session_time_seconds', 0),
-                'none',  # Would need to parse from last action
-                data.get('last_action_result', 'none')
-            ))
+            with self.timed('write', state_file), self.savepoint() as cursor:
+                self.store_game_state(cursor, data)
+            self.mark_ingested(state_file)
+            if self.delta:
+                self.delta_encoder.apply(data.get('inventory', []), data.get('skills', []))
             
+        except Exception as e:
+            logging.error(f"Error collecting game state: {e}")
+            self.metrics.error()
+    
+    def store_game_state(self, cursor: sqlite3.Cursor, data: dict, timestamp: str = None):
+        """Write one ai_state.json snapshot (timestamp defaults to now, UTC)"""
+        # Child rows share the snapshot's timestamp
+        if timestamp is None:
+            timestamp = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        
+        # Insert game state snapshot
+        cursor.execute('''
+            INSERT INTO game_states (
+                timestamp, hp_current, hp_max, ap_current, ap_max, level, experience,
+                armor_class, map_name, tile, elevation, in_combat, session_time,
+                last_action, last_action_result
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            timestamp,
+            data.get('hit_points', 0),
+            data.get('max_hit_points', 0),
+            data.get('action_points', 0),
+            data.get('max_action_points', 0),
+            data.get('level', 1),
+            data.get('experience', 0),
+            data.get('armor_class', 0),
+            data.get('map_name', 'Unknown'),
+            data.get('player_tile', 0),
+            data.get('player_elevation', 0),
+            data.get('in_combat', False),
+            data.get('session_time_seconds', 0),
+            'none',  # Would need to parse from last action
+            data.get('last_action_result', 'none')
+        ))
+        self.metrics.add_rows('game_states', cursor.rowcount)
+        state_id = cursor.lastrowid
+        
+        rollups.record(cursor, state_id, data.get('total_kills', 0), data.get('total_damage_dealt', 0))
+        map_visits.record(cursor, state_id, data.get('map_name', 'Unknown'), timestamp)
+        
+        inventory = data.get('inventory', [])
+        skills = data.get('skills', [])
+        
+        if self.delta:
+            self.store_deltas(cursor, state_id, timestamp, inventory, skills)
+        else:
             # Store inventory
-            inventory = data.get('inventory', [])
-            for item in inventory:
-                cursor.execute('''
-                    INSERT INTO inventory_snapshots (item_pid, item_name, quantity)
-                    VALUES (?, ?, ?)
-                ''', (item.get('pid', 0), item.get('name', 'Unknown'), item.get('quantity', 1)))
+            cursor.executemany('''
+                INSERT INTO inventory_snapshots (snapshot_id, timestamp, item_pid, item_name, quantity)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [
+                (state_id, timestamp, item.get('pid', 0), item.get('name', 'Unknown'), item.get('quantity', 1))
+                for item in inventory
+            ])
+            self.metrics.add_rows('inventory_snapshots', cursor.rowcount)
             
             # Store skills
-            skills = data.get('skills', [])
-            for skill in skills:
-                cursor.execute('''
-                    INSERT INTO skills (skill_name, skill_value)
-                    VALUES (?, ?)
-                ''', (skill.get('name', 'Unknown'), skill.get('value', 0)))
-            
-            # Store session stats
-            cursor.execute('''
-                INSERT INTO session_stats (total_kills, total_damage, session_time)
-                VALUES (?, ?, ?)
-            ''', (
-                data.get('total_kills', 0),
-                data.get('total_damage_dealt', 0),
-                data.get('session_time_seconds', 0)
-            ))
-            
-            conn.commit()
-            conn.close()
-            
-        except Exception as e:
-            logging.error(f"Error collecting game state: {e}")
+            cursor.executemany('''
+                INSERT INTO skills (snapshot_id, timestamp, skill_name, skill_value)
+                VALUES (?, ?, ?, ?)
+            ''', [
+                (state_id, timestamp, skill.get('name', 'Unknown'), skill.get('value', 0))
+                for skill in skills
+            ])
+            self.metrics.add_rows('skills', cursor.rowcount)
+        
+        # Store session stats
+        cursor.execute('''
+            INSERT INTO session_stats (snapshot_id, timestamp, total_kills, total_damage, session_time)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (
+            state_id,
+            timestamp,
+            data.get('total_kills', 0),
+            data.get('total_damage_dealt', 0),
+            data.get('session_time_seconds', 0)
+        ))
+        self.metrics.add_rows('session_stats', cursor.rowcount)
+    
+    def store_deltas(self, cursor: sqlite3.Cursor, snapshot_id: int, timestamp: str,
+                     inventory: list, skills: list):
+        """Write only the inventory items and skills that changed since the last snapshot"""
+        cursor.executemany('''
+            INSERT INTO inventory_changes (snapshot_id, timestamp, item_pid, item_name, quantity)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [
+            (snapshot_id, timestamp, pid, name, quantity)
+            for pid, name, quantity in self.delta_encoder.inventory_changes(inventory)
+        ])
+        self.metrics.add_rows('inventory_changes', cursor.rowcount)
+        
+        cursor.executemany('''
+            INSERT INTO skill_changes (snapshot_id, timestamp, skill_name, skill_value)
+            VALUES (?, ?, ?, ?)
+        ''', [
+            (snapshot_id, timestamp, name, value)
+            for name, value in self.delta_encoder.skill_changes(skills)
+        ])
+        self.metrics.add_rows('skill_changes', cursor.rowcount)
     
     def collect_character_data(self):
         """Read and store character data"""
         char_file = self.game_dir / "character_data.json"
         
-        if not char_file.exists():
-            return
-        
         try:
-            with open(char_file, 'r') as f:
-                data = json.load(f)
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            data = self.read_if_changed(char_file)
+            if data is None:
+                return
             
-            # Store items collected history
-            items_collected = data.get('items_collected', [])
-            for item in items_collected:
-                # Check if already stored
-                cursor.execute('''
-                    SELECT COUNT(*) FROM items_collected 
-                    WHERE item_pid = ? AND timestamp = ?
-                ''', (item.get('pid', 0), item.get('timestamp', 0)))
-                
-                if cursor.fetchone()[0] == 0:
-                    cursor.execute('''
-                        INSERT INTO items_collected (timestamp, item_pid, item_name, quantity, location)
-                        VALUES (datetime(?, 'unixepoch'), ?, ?, ?, ?)
-                    ''', (
-                        item.get('timestamp', 0),
-                        item.get('pid', 0),
-                        item.get('name', 'Unknown'),
-                        item.get('quantity', 1),
-                        item.get('location', 'Unknown')
-                    ))
-            
-            # Store milestones
-            milestones = data.get('milestones', [])
-            for milestone in milestones:
-                cursor.execute('''
-                    SELECT COUNT(*) FROM milestones 
-                    WHERE description = ? AND timestamp = ?
-                ''', (milestone.get('description', ''), milestone.get('timestamp', 0)))
-                
-                if cursor.fetchone()[0] == 0:
-                    cursor.execute('''
-                        INSERT INTO milestones (timestamp, description, location)
-                        VALUES (datetime(?, 'unixepoch'), ?, ?)
-                    ''', (
-                        milestone.get('timestamp', 0),
-                        milestone.get('description', ''),
-                        milestone.get('location', 'Unknown')
-                    ))
-            
-            conn.commit()
-            conn.close()
+            with self.timed('write', char_file), self.savepoint() as cursor:
+                self.store_character_data(cursor, data)
+            self.mark_ingested(char_file)
             
         except Exception as e:
             logging.error(f"Error collecting character data: {e}")
+            self.metrics.error()
+    
+    def store_character_data(self, cursor: sqlite3.Cursor, data: dict):
+        """Write items collected and milestones not yet in the database"""
+        # Store items collected history; duplicates hit idx_items_collected_unique
+        cursor.executemany('''
+            INSERT OR IGNORE INTO items_collected (timestamp, item_pid, item_name, quantity, location)
+            VALUES (datetime(?, 'unixepoch'), ?, ?, ?, ?)
+        ''', [
+            (
+                item.get('timestamp', 0),
+                item.get('pid', 0),
+                item.get('name', 'Unknown'),
+                item.get('quantity', 1),
+                item.get('location', 'Unknown')
+            )
+            for item in data.get('items_collected', [])
+        ])
+        self.metrics.add_rows('items_collected', cursor.rowcount)
+        
+        # Store milestones; duplicates hit idx_milestones_unique
+        cursor.executemany('''
+            INSERT OR IGNORE INTO milestones (timestamp, description, location)
+            VALUES (datetime(?, 'unixepoch'), ?, ?)
+        ''', [
+            (
+                milestone.get('timestamp', 0),
+                milestone.get('description', ''),
+                milestone.get('location', 'Unknown')
+            )
+            for milestone in data.get('milestones', [])
+        ])
+        self.metrics.add_rows('milestones', cursor.rowcount)
     
     def collect_memory(self):
         """Read and store AI memory"""
         memory_file = self.game_dir / "ai_memory.json"
         
-        if not memory_file.exists():
-            return
-        
         try:
-            with open(memory_file, 'r') as f:
-                data = json.load(f)
+            data = self.read_if_changed(memory_file)
+            if data is None:
+                return
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            memories = data.get('memories', [])
-            for memory in memories:
-                # Check if already stored
-                cursor.execute('''
-                    SELECT COUNT(*) FROM decisions 
-                    WHERE timestamp = ? AND action = ?
-                ''', (memory.get('timestamp', 0), memory.get('action', '')))
-                
-                if cursor.fetchone()[0] == 0:
-                    cursor.execute('''
-                        INSERT INTO decisions (timestamp, map_name, tile, elevation, action, target, result)
-                        VALUES (datetime(?, 'unixepoch'), ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        memory.get('timestamp', 0),
-                        memory.get('map', 'Unknown'),
-                        memory.get('tile', 0),
-                        memory.get('elevation', 0),
-                        memory.get('action', ''),
-                        memory.get('target', ''),
-                        memory.get('result', '')
-                    ))
-            
-            conn.commit()
-            conn.close()
+            with self.timed('write', memory_file), self.savepoint() as cursor:
+                self.store_memory(cursor, data)
+            self.mark_ingested(memory_file)
             
         except Exception as e:
             logging.error(f"Error collecting memory: {e}")
+            self.metrics.error()
     
-    def run(self, interval: float = 1.0):
+    def store_memory(self, cursor: sqlite3.Cursor, data: dict):
+        """Write AI memory entries appended since the last ingested one"""
+        memories = data.get('memories', [])
+        start = self.memory_resume_index(memories)
+        
+        # Duplicates (after a full rescan) hit idx_decisions_unique
+        cursor.executemany('''
+            INSERT OR IGNORE INTO decisions (timestamp, map_name, tile, elevation, action, target, result)
+            VALUES (datetime(?, 'unixepoch'), ?, ?, ?, ?, ?, ?)
+        ''', [
+            (
+                memory.get('timestamp', 0),
+                memory.get('map', 'Unknown'),
+                memory.get('tile', 0),
+                memory.get('elevation', 0),
+                memory.get('action', ''),
+                memory.get('target', ''),
+                memory.get('result', '')
+            )
+            for memory in memories[start:]
+        ])
+        self.metrics.add_rows('decisions', cursor.rowcount)
+        
+        if memories:
+            memory_cursor = {
+                'count': len(memories),
+                'timestamp': memories[-1].get('timestamp', 0),
+                'hash': memory_entry_hash(memories[-1]),
+            }
+            self.set_meta('memory_cursor', json.dumps(memory_cursor))
+            self.memory_cursor = memory_cursor
+    
+    def memory_resume_index(self, memories: list) -> int:
+        """Index of the first memory entry not yet ingested (0 = full rescan)"""
+        cursor = self.memory_cursor
+        if not cursor:
+            return 0
+        
+        # Common case: the list only grew since the last cycle
+        count = cursor['count']
+        if 0 < count <= len(memories) and memory_entry_hash(memories[count - 1]) == cursor['hash']:
+            return count
+        
+        # The game keeps a ring buffer of recent memories, so once it is full
+        # old entries drop off the front; find the last ingested entry instead
+        for index in range(len(memories) - 1, -1, -1):
+            entry = memories[index]
+            if entry.get('timestamp', 0) < cursor['timestamp']:
+                break
+            if memory_entry_hash(entry) == cursor['hash']:
+                return index + 1
+        
+        logging.info("AI memory cursor not found in ai_memory.json, rescanning all entries")
+        return 0
+    
+    def load_memory_cursor(self):
+        """Read the persisted ai_memory.json high-water mark"""
+        value = self.get_meta('memory_cursor')
+        return json.loads(value) if value else None
+    
+    def collectors(self):
+        """Map each watched export to the method that ingests it"""
+        return {
+            "ai_state.json": self.collect_game_state,
+            "character_data.json": self.collect_character_data,
+            "ai_memory.json": self.collect_memory,
+        }
+    
+    def collect_cycle(self, changed=None):
+        """Run the collectors for the changed files (default: all) in one transaction"""
+        self.conn.execute('BEGIN')
+        changes = self.conn.total_changes
+        try:
+            for name, collect in self.collectors().items():
+                if changed is None or name in changed:
+                    collect()
+            if self.conn.total_changes != changes:
+                self.bump_data_version()
+            started = time.perf_counter()
+            self.conn.execute('COMMIT')
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            self.ingested_signatures.clear()
+            self.uncommitted_mtimes.clear()
+            if self.delta:
+                self.delta_encoder.rehydrate(self.conn.cursor())
+            self.memory_cursor = self.load_memory_cursor()
+            raise
+        
+        committed = time.time()
+        self.metrics.observe_stage('commit', 'cycle', time.perf_counter() - started)
+        for name, mtime in self.uncommitted_mtimes.items():
+            self.metrics.observe_lag(name, committed - mtime)
+        self.uncommitted_mtimes.clear()
+        self.metrics.cycle_done()
+    
+    def report_metrics(self):
+        """Write the metrics textfile and log a summary line when they are due"""
+        now = time.monotonic()
+        if self.metrics_file and now - self.last_metrics_write >= self.metrics_file_interval:
+            self.last_metrics_write = now
+            try:
+                self.metrics.write_textfile(self.metrics_file)
+            except OSError as e:
+                logging.error(f"Error writing metrics file: {e}")
+        
+        if self.summary_interval and now - self.last_summary >= self.summary_interval:
+            self.last_summary = now
+            logging.info(self.metrics.summary())
+    
+    def maybe_prune(self):
+        """Apply the retention policy at most once an hour"""
+        if self.retention_days is None:
+            return
+        if self.last_prune is not None and time.monotonic() - self.last_prune < 3600:
+            return
+        
+        self.last_prune = time.monotonic()
+        self.conn.execute('BEGIN')
+        try:
+            if any(rollups.prune(self.conn.cursor(), self.retention_days).values()):
+                self.bump_data_version()
+            self.conn.execute('COMMIT')
+        except Exception as e:
+            self.conn.execute('ROLLBACK')
+            logging.error(f"Error pruning old rows: {e}")
+    
+    def run(self, interval: float = 1.0, watch: bool = False):
         """Main collection loop"""
+        if self.publisher:
+            self.publisher.start()
+        
+        if watch:
+            self.run_watching(interval)
+            return
+        
         self.running = True
         logging.info(f"Starting data collection (interval: {interval}s)")
         
         while self.running:
             try:
-                self.collect_game_state()
-                self.collect_character_data()
-                self.collect_memory()
+                self.collect_cycle()
+                self.maybe_prune()
+                self.report_metrics()
                 time.sleep(interval)
             except KeyboardInterrupt:
                 logging.info("Stopping data collector...")
@@ -347,10 +760,53 @@ class GameDataCollector:
             except Exception as e:
                 logging.error(f"Error in collection loop: {e}")
                 time.sleep(interval)
+        
+        self.close()
+    
+    def run_watching(self, interval: float = 1.0):
+        """Collection loop driven by file replacement events"""
+        watcher = FileWatcher(self.game_dir, self.collectors().keys(), poll_interval=interval)
+        self.running = True
+        logging.info(f"Starting data collection (watch mode: {watcher.mode})")
+        
+        # Pick up whatever the game exported before we started watching
+        changed = None
+        
+        try:
+            while self.running:
+                try:
+                    if changed is None or changed:
+                        self.collect_cycle(changed)
+                    self.maybe_prune()
+                    self.report_metrics()
+                    # Short timeout so stop() is noticed promptly
+                    changed = watcher.wait(timeout=1.0)
+                except KeyboardInterrupt:
+                    logging.info("Stopping data collector...")
+                    self.running = False
+                except Exception as e:
+                    logging.error(f"Error in collection loop: {e}")
+                    changed = None
+                    time.sleep(interval)
+        finally:
+            watcher.close()
+            self.close()
     
     def stop(self):
         """Stop the collector"""
         self.running = False
+    
+    def close(self):
+        """Close the database connection"""
+        if self.publisher and self.publisher.thread is not None:
+            self.publisher.stop()
+            try:
+                self.publisher.publish()  # Leave readers with the final state
+            except (sqlite3.Error, OSError) as e:
+                logging.error(f"Error publishing replica: {e}")
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
 
 
 if __name__ == "__main__":
@@ -360,8 +816,31 @@ if __name__ == "__main__":
     parser.add_argument("--game-dir", default="../..", help="Path to game directory")
     parser.add_argument("--db-path", default="./database/game_data.db", help="Path to SQLite database")
     parser.add_argument("--interval", type=float, default=1.0, help="Collection interval in seconds")
+    parser.add_argument("--watch", action="store_true",
+                        help="Collect only when the game replaces a file (inotify, stat polling fallback)")
+    parser.add_argument("--delta", action="store_true",
+                        help="Store only changed inventory items and skills (see delta_store.py)")
+    parser.add_argument("--retention-days", type=float, default=None,
+                        help="Prune raw game_states/session_stats older than this once rolled up")
+    parser.add_argument("--metrics-file", default=None,
+                        help="Write Prometheus text metrics here every 10 seconds")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve Prometheus metrics on http://0.0.0.0:PORT/metrics")
+    parser.add_argument("--summary-interval", type=float, default=60.0,
+                        help="Seconds between collector stats log lines (0 disables)")
+    parser.add_argument("--replica-dir", default=None,
+                        help="Publisher mode: publish read-only replicas here for API servers")
+    parser.add_argument("--replica-interval", type=float, default=10.0,
+                        help="Seconds between replica publishes (only when the data changed)")
     
     args = parser.parse_args()
     
-    collector = GameDataCollector(args.game_dir, args.db_path)
-    collector.run(args.interval)
+    collector = GameDataCollector(args.game_dir, args.db_path, delta=args.delta,
+                                  retention_days=args.retention_days,
+                                  metrics_file=args.metrics_file,
+                                  summary_interval=args.summary_interval,
+                                  replica_dir=args.replica_dir,
+                                  replica_interval=args.replica_interval)
+    if args.metrics_port:
+        collector.metrics.serve(args.metrics_port)
+    collector.run(args.interval, watch=args.watch)
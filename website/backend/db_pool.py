@@ -0,0 +1,120 @@
+"""
+Read-Only Connection Pool for the API Server
+
+Keeps one read-only SQLite connection per worker thread instead of connecting
+on every request, so the page cache, mmap and prepared-statement cache survive
+between requests. Connections are reopened when the database file is replaced
+(rotation, restore, a new replica) or after a database error.
+
+With replica_dir set, the pool reads the newest replica published by
+replica_publisher.py instead of the live database (falling back to db_path
+until the first one appears). Replicas never change once published, so they
+are opened immutable: no locks, no contention with the collector's writes.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+from replica_publisher import pointer_identity, read_pointer
+
+
+class ReadOnlyConnectionPool:
+    """Per-thread read-only connections to one SQLite database"""
+
+    def __init__(self, db_path: str, mmap_size: int = 256 * 1024 * 1024,
+                 cache_size_kb: int = 32000, cached_statements: int = 256,
+                 connection_class: type = sqlite3.Connection, replica_dir: Optional[str] = None):
+        self.db_path = db_path
+        self.replica_dir = replica_dir
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self.cached_statements = cached_statements
+        self.connection_class = connection_class  # e.g. ApiMetrics.connection_class
+
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.connections = set()
+        self.pointer = (None, None)  # (pointer file identity, replica path) last read
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, reopened if the database file changed"""
+        path = self.current_path()
+        identity = self._file_identity(path)
+        conn = getattr(self.local, 'conn', None)
+
+        if conn is not None and self.local.identity != identity:
+            logging.info(f"Database file {path} was replaced, reconnecting")
+            self.discard()
+            conn = None
+
+        if conn is None:
+            conn = self.open(path)
+            self.local.conn = conn
+            self.local.identity = identity
+            with self.lock:
+                self.connections.add(conn)
+
+        return conn
+
+    def current_path(self) -> str:
+        """The file to read: the current replica, or db_path"""
+        if not self.replica_dir:
+            return self.db_path
+        identity = pointer_identity(self.replica_dir)
+        known_identity, path = self.pointer
+        if identity != known_identity:
+            path = read_pointer(self.replica_dir)
+            self.pointer = (identity, path)
+        return path or self.db_path
+
+    def file_identity(self) -> Optional[Tuple[str, int, int]]:
+        """Changes whenever connections should be reopened (file replaced, new replica)"""
+        return self._file_identity(self.current_path())
+
+    def discard(self):
+        """Close this thread's connection; the next request opens a fresh one"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            return
+        self.local.conn = None
+        with self.lock:
+            self.connections.discard(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def close_all(self):
+        """Close every pooled connection (at shutdown)"""
+        with self.lock:
+            connections, self.connections = self.connections, set()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def open(self, path: Optional[str] = None) -> sqlite3.Connection:
+        """A new read-only connection with the pool's settings (caller closes it)"""
+        path = path or self.current_path()
+        uri = Path(path).resolve().as_uri() + '?mode=ro'
+        if path != self.db_path:
+            uri += '&immutable=1'  # A published replica
+        conn = sqlite3.connect(uri, uri=True, cached_statements=self.cached_statements,
+                               check_same_thread=False, factory=self.connection_class)
+        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+        conn.execute('PRAGMA query_only = ON')
+        conn.execute(f'PRAGMA mmap_size = {int(self.mmap_size)}')
+        conn.execute(f'PRAGMA cache_size = -{int(self.cache_size_kb)}')
+        return conn
+
+    def _file_identity(self, path: str) -> Optional[Tuple[str, int, int]]:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (path, st.st_dev, st.st_ino)
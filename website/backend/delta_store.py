@@ -0,0 +1,112 @@
+"""
+Delta Storage for Inventory and Skills
+
+In delta mode the collector stores only inventory items and skill values that
+changed since the previous snapshot, each tagged with the game_states id of the
+snapshot that produced it. A quantity of 0 in inventory_changes marks an item that
+left the inventory. The reader helpers rebuild the full inventory or skill list as
+of any snapshot.
+"""
+
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+# Larger than any rowid, used when reading the latest state
+LATEST_SNAPSHOT = (1 << 63) - 1
+
+
+class DeltaEncoder:
+    """Diffs inventory and skills against the last stored version"""
+
+    def __init__(self):
+        # pid -> (name, quantity) and skill name -> value as last written
+        self.inventory: Dict[int, Tuple[str, int]] = {}
+        self.skills: Dict[str, int] = {}
+
+    def rehydrate(self, cursor: sqlite3.Cursor):
+        """Reload the last stored inventory and skills from the database"""
+        self.inventory = {
+            row[0]: (row[1], row[2]) for row in inventory_at(cursor)
+        }
+        self.skills = {row[0]: row[1] for row in skills_at(cursor)}
+
+    def inventory_changes(self, items: List[dict]) -> List[Tuple[int, str, int]]:
+        """(pid, name, quantity) rows for added, changed and removed items"""
+        current = self._merge_inventory(items)
+        changes = [
+            (pid, name, quantity)
+            for pid, (name, quantity) in current.items()
+            if self.inventory.get(pid) != (name, quantity)
+        ]
+        changes.extend(
+            (pid, name, 0)
+            for pid, (name, _) in self.inventory.items()
+            if pid not in current
+        )
+        return changes
+
+    def skill_changes(self, skills: List[dict]) -> List[Tuple[str, int]]:
+        """(name, value) rows for skills whose value changed"""
+        current = self._merge_skills(skills)
+        return [
+            (name, value)
+            for name, value in current.items()
+            if self.skills.get(name) != value
+        ]
+
+    def apply(self, items: List[dict], skills: List[dict]):
+        """Record a snapshot as written, after its changes have been inserted"""
+        self.inventory = self._merge_inventory(items)
+        self.skills.update(self._merge_skills(skills))
+
+    @staticmethod
+    def _merge_inventory(items: List[dict]) -> Dict[int, Tuple[str, int]]:
+        merged = {}
+        for item in items:
+            pid = item.get('pid', 0)
+            name, quantity = merged.get(pid, (item.get('name', 'Unknown'), 0))
+            merged[pid] = (name, quantity + item.get('quantity', 1))
+        return merged
+
+    @staticmethod
+    def _merge_skills(skills: List[dict]) -> Dict[str, int]:
+        return {skill.get('name', 'Unknown'): skill.get('value', 0) for skill in skills}
+
+
+def snapshot_at(cursor: sqlite3.Cursor, timestamp: str) -> Optional[int]:
+    """Id of the last game_states snapshot taken at or before a timestamp"""
+    cursor.execute('SELECT MAX(id) FROM game_states WHERE timestamp <= ?', (timestamp,))
+    return cursor.fetchone()[0]
+
+
+def inventory_at(cursor: sqlite3.Cursor, snapshot_id: Optional[int] = None) -> List[tuple]:
+    """(item_pid, item_name, quantity) rows held as of a snapshot (default: latest)"""
+    cursor.execute('''
+        SELECT c.item_pid, c.item_name, c.quantity
+        FROM inventory_changes c
+        JOIN (
+            SELECT item_pid, MAX(id) AS id
+            FROM inventory_changes
+            WHERE snapshot_id <= ?
+            GROUP BY item_pid
+        ) latest ON latest.id = c.id
+        WHERE c.quantity > 0
+        ORDER BY c.item_pid
+    ''', (LATEST_SNAPSHOT if snapshot_id is None else snapshot_id,))
+    return cursor.fetchall()
+
+
+def skills_at(cursor: sqlite3.Cursor, snapshot_id: Optional[int] = None) -> List[tuple]:
+    """(skill_name, skill_value, timestamp) rows as of a snapshot (default: latest)"""
+    cursor.execute('''
+        SELECT c.skill_name, c.skill_value, c.timestamp
+        FROM skill_changes c
+        JOIN (
+            SELECT skill_name, MAX(id) AS id
+            FROM skill_changes
+            WHERE snapshot_id <= ?
+            GROUP BY skill_name
+        ) latest ON latest.id = c.id
+        ORDER BY c.id
+    ''', (LATEST_SNAPSHOT if snapshot_id is None else snapshot_id,))
+    return cursor.fetchall()
@@ -0,0 +1,58 @@
+"""
+Series Downsampling
+
+Largest-Triangle-Three-Buckets (LTTB) reduction for chart series: keeps the
+points that preserve the visual shape of a line (peaks, dips, steps) while
+cutting a day of per-second rows down to what a chart can actually draw.
+"""
+
+from datetime import datetime
+from typing import Dict, List
+
+
+def lttb(rows: List[Dict], points: int, y_key: str, x_key: str = 'timestamp') -> List[Dict]:
+    """Pick `points` rows from rows (ordered by x_key) that best preserve the y_key line"""
+    if len(rows) <= points or points < 3:
+        return rows
+
+    xs = [_x_value(row[x_key]) for row in rows]
+    ys = [row[y_key] or 0 for row in rows]
+
+    # First and last rows are always kept; the rest are split into buckets
+    sampled = [rows[0]]
+    bucket_size = (len(rows) - 2) / (points - 2)
+    selected = 0
+
+    for bucket in range(points - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        # Average of the next bucket is the third triangle vertex
+        next_start = end
+        next_end = min(int((bucket + 2) * bucket_size) + 1, len(rows))
+        if next_end > next_start:
+            avg_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+            avg_y = sum(ys[next_start:next_end]) / (next_end - next_start)
+        else:
+            avg_x, avg_y = xs[-1], ys[-1]
+
+        ax, ay = xs[selected], ys[selected]
+        best_area = -1.0
+        best = start
+        for i in range(start, end):
+            area = abs((ax - avg_x) * (ys[i] - ay) - (ax - xs[i]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = i
+
+        sampled.append(rows[best])
+        selected = best
+
+    sampled.append(rows[-1])
+    return sampled
+
+
+def _x_value(timestamp) -> float:
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    return datetime.fromisoformat(timestamp).timestamp()
@@ -0,0 +1,151 @@
+"""
+File Watcher for Game JSON Exports
+
+Waits for the game's JSON exports to change instead of re-reading them on a timer.
+The C++ exporter writes `<name>.tmp` and renames it over `<name>`, so on Linux we
+listen for inotify IN_MOVED_TO events on the game directory. Other platforms (or
+kernels without inotify) fall back to comparing os.stat() signatures.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+# inotify constants from <sys/inotify.h>
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+def _load_inotify():
+    """Return libc if it exposes inotify, otherwise None"""
+    if not sys.platform.startswith('linux'):
+        return None
+
+    libc_name = ctypes.util.find_library('c')
+    if not libc_name:
+        return None
+
+    try:
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class FileWatcher:
+    """Reports which watched files in a directory have been replaced"""
+
+    def __init__(self, directory: str, filenames: Iterable[str], poll_interval: float = 1.0,
+                 use_inotify: bool = True):
+        self.directory = Path(directory)
+        self.filenames = set(filenames)
+        self.poll_interval = poll_interval
+        self.fd = None
+        self.stat_signatures: Dict[str, Optional[Tuple[int, int, int]]] = {}
+
+        libc = _load_inotify() if use_inotify else None
+        if libc is not None:
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                path = os.fsencode(str(self.directory))
+                if libc.inotify_add_watch(fd, path, IN_MOVED_TO) >= 0:
+                    self.fd = fd
+                else:
+                    os.close(fd)
+
+        if self.fd is None:
+            # Prime signatures so the first poll only reports real changes
+            for name in self.filenames:
+                self.stat_signatures[name] = self._stat_signature(name)
+            logging.info(f"File watcher using stat polling every {poll_interval}s on {self.directory}")
+        else:
+            logging.info(f"File watcher using inotify on {self.directory}")
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self.fd is not None else "stat"
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        """Block until at least one watched file is replaced or timeout expires"""
+        if self.fd is not None:
+            return self._wait_inotify(timeout)
+        return self._wait_stat(timeout)
+
+    def _wait_inotify(self, timeout: Optional[float]) -> Set[str]:
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        while True:
+            try:
+                buffer = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not buffer:
+                break
+
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(buffer):
+                _, mask, _, name_len = _EVENT_HEADER.unpack_from(buffer, offset)
+                offset += _EVENT_HEADER.size
+                name = buffer[offset:offset + name_len].rstrip(b'\0').decode(errors='replace')
+                offset += name_len
+
+                if mask & IN_Q_OVERFLOW:
+                    # Kernel dropped events; treat everything as changed
+                    changed.update(self.filenames)
+                elif mask & IN_MOVED_TO and name in self.filenames:
+                    changed.add(name)
+
+        return changed
+
+    def _wait_stat(self, timeout: Optional[float]) -> Set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            changed = set()
+            for name in self.filenames:
+                signature = self._stat_signature(name)
+                if signature is not None and signature != self.stat_signatures.get(name):
+                    changed.add(name)
+                self.stat_signatures[name] = signature
+
+            if changed:
+                return changed
+
+            if deadline is None:
+                time.sleep(self.poll_interval)
+                continue
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return set()
+            time.sleep(min(self.poll_interval, remaining))
+
+    def _stat_signature(self, name: str) -> Optional[Tuple[int, int, int]]:
+        """Inode, mtime and size; a rename into place always yields a new inode"""
+        try:
+            st = os.stat(self.directory / name)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def close(self):
+        """Release the inotify descriptor"""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
@@ -0,0 +1,310 @@
+"""
+Live Feed (Server-Sent Events)
+
+One tailer thread per API process watches the database for commits (PRAGMA
+data_version) and reads rows added to game_states, milestones, decisions and
+items_collected since its last look. New rows are fanned out to every connected
+client as compact SSE events, so N viewers cost one database reader instead of
+N x M polling requests.
+
+Event ids are "<state>.<milestone>.<decision>.<item>": the highest row id the
+client has seen in each table. A reconnecting client sends it back as
+Last-Event-ID and gets the rows it missed from the database before going live.
+
+Each client has a bounded queue. A client that falls behind has its queue
+dropped and catches up from the database instead: only the newest state, but
+every missed milestone, decision and item.
+"""
+
+import asyncio
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from db_pool import ReadOnlyConnectionPool
+
+# event type -> (table, columns sent to clients)
+FEED_TABLES = {
+    'state': ('game_states', 'id, timestamp, hp_current, hp_max, ap_current, ap_max, level, '
+                             'experience, armor_class, map_name, in_combat'),
+    'milestone': ('milestones', 'id, timestamp, description, location'),
+    'decision': ('decisions', 'id, timestamp, map_name, action, target, result'),
+    'item': ('items_collected', 'id, timestamp, item_pid, item_name, quantity, location'),
+}
+
+KEEPALIVE_SECONDS = 15.0
+
+
+def format_event_id(marks: Dict[str, int]) -> str:
+    return '.'.join(str(marks[kind]) for kind in FEED_TABLES)
+
+
+def parse_event_id(value: Optional[str]) -> Optional[Dict[str, int]]:
+    """Marks from a Last-Event-ID header, or None if absent or malformed"""
+    if not value:
+        return None
+    parts = value.split('.')
+    if len(parts) != len(FEED_TABLES) or not all(part.isdigit() for part in parts):
+        return None
+    return dict(zip(FEED_TABLES, (int(part) for part in parts)))
+
+
+def current_marks(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Highest row id in each feed table"""
+    return {
+        kind: conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0]
+        for kind, (table, _) in FEED_TABLES.items()
+    }
+
+
+def fetch_after(conn: sqlite3.Connection, kind: str, after: int, limit: int) -> List[Dict]:
+    """Rows of one feed table with id > after, oldest first"""
+    table, columns = FEED_TABLES[kind]
+    cursor = conn.execute(f'''
+        SELECT {columns} FROM {table}
+        WHERE id > ?
+        ORDER BY id
+        LIMIT ?
+    ''', (after, limit))
+    names = [column[0] for column in cursor.description]
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+def fetch_latest_state(conn: sqlite3.Connection) -> Optional[Dict]:
+    table, columns = FEED_TABLES['state']
+    cursor = conn.execute(f'SELECT {columns} FROM {table} ORDER BY id DESC LIMIT 1')
+    row = cursor.fetchone()
+    return dict(zip([column[0] for column in cursor.description], row)) if row else None
+
+
+class Subscriber:
+    """One connected client: a bounded queue of (kind, row) plus an overflow flag"""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def offer(self, item):
+        """Called from the tailer thread"""
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            # Slow client: stop queueing, it will catch up from the database
+            self.overflowed = True
+
+    def reset(self):
+        self.queue = queue.Queue(maxsize=self.queue_size)
+        self.overflowed = False
+
+
+class AsyncSubscriber(Subscriber):
+    """Subscriber whose queue lives on an asyncio event loop"""
+
+    def __init__(self, queue_size: int, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        super().__init__(queue_size)
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def offer(self, item):
+        """Raises RuntimeError once the event loop is closed"""
+        self.loop.call_soon_threadsafe(self._put, item)
+
+    def _put(self, item):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def reset(self):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.overflowed = False
+
+
+class LiveFeed:
+    """Shared database tailer fanning new rows out to SSE subscribers"""
+
+    def __init__(self, pool: ReadOnlyConnectionPool, poll_interval: float = 0.5,
+                 queue_size: int = 256, replay_limit: int = 1000):
+        self.pool = pool
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.replay_limit = replay_limit
+
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.thread = None
+        self.ready = threading.Event()
+
+    def subscribe(self, subscriber: Optional[Subscriber] = None) -> Subscriber:
+        subscriber = subscriber or Subscriber(self.queue_size)
+        with self.lock:
+            self.subscribers.add(subscriber)
+            if self.thread is None or not self.thread.is_alive():
+                self.ready = threading.Event()
+                self.thread = threading.Thread(target=self._tail, name="live-feed", daemon=True)
+                self.thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def publish(self, kind: str, row: Dict):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            if not subscriber.overflowed:
+                try:
+                    subscriber.offer((kind, row))
+                except RuntimeError:
+                    # Its event loop is closed (server shut down); the client is gone
+                    self.unsubscribe(subscriber)
+
+    def _tail(self):
+        """Tailer thread: publish rows committed since the last poll; exits when idle"""
+        conn = None
+        identity = None
+        marks = None
+        data_version = None
+        while True:
+            try:
+                if conn is not None and self.pool.file_identity() != identity:
+                    # A new replica (or a replaced file): its commits don't show in data_version
+                    conn.close()
+                    conn = None
+                    data_version = None
+
+                if conn is None:
+                    identity = self.pool.file_identity()
+                    conn = self.pool.open()
+                    if marks is None:
+                        marks = current_marks(conn)
+                        self.ready.set()
+
+                version = conn.execute('PRAGMA data_version').fetchone()[0]
+                if version != data_version:
+                    data_version = version
+                    for kind in FEED_TABLES:
+                        while True:
+                            rows = fetch_after(conn, kind, marks[kind], self.replay_limit)
+                            for row in rows:
+                                self.publish(kind, row)
+                            if rows:
+                                marks[kind] = rows[-1]['id']
+                            if len(rows) < self.replay_limit:
+                                break
+            except sqlite3.Error as e:
+                # Reopen on the next poll; marks survive, so no rows are skipped
+                logging.error(f"Live feed tailer error: {e}")
+                if conn is not None:
+                    conn.close()
+                conn = None
+                data_version = None
+
+            time.sleep(self.poll_interval)
+            with self.lock:
+                if not self.subscribers:
+                    self.thread = None
+                    break
+
+        if conn is not None:
+            conn.close()
+
+    def stream(self, last_event_id: Optional[str] = None) -> Iterator[str]:
+        """SSE text for one client, resuming after last_event_id if given"""
+        subscriber = self.subscribe()
+        try:
+            events, marks = self._start(last_event_id)
+            yield from events
+
+            while True:
+                if subscriber.overflowed:
+                    subscriber.reset()
+                    yield from self._replay(self.pool.connection(), marks)
+
+                try:
+                    kind, row = subscriber.queue.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+
+                if row['id'] > marks[kind]:
+                    marks[kind] = row['id']
+                    yield _event(kind, row, format_event_id(marks))
+        finally:
+            self.unsubscribe(subscriber)
+
+    async def stream_async(self, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+        """stream() for asyncio servers: waits on the loop, reads the database in threads"""
+        subscriber = self.subscribe(AsyncSubscriber(self.queue_size, asyncio.get_running_loop()))
+        try:
+            events, marks = await asyncio.to_thread(self._start, last_event_id)
+            for event in events:
+                yield event
+
+            while True:
+                if subscriber.overflowed:
+                    subscriber.reset()
+                    replayed = await asyncio.to_thread(
+                        lambda: list(self._replay(self.pool.connection(), marks)))
+                    for event in replayed:
+                        yield event
+
+                try:
+                    kind, row = await asyncio.wait_for(subscriber.queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+
+                if row['id'] > marks[kind]:
+                    marks[kind] = row['id']
+                    yield _event(kind, row, format_event_id(marks))
+        finally:
+            self.unsubscribe(subscriber)
+
+    def _start(self, last_event_id: Optional[str]):
+        """(opening events, marks) for a client that has just subscribed"""
+        # Subscribe (and let the tailer take its marks) before reading ours, so
+        # nothing committed in between is lost; rows already seen are skipped by id
+        self.ready.wait(timeout=5)
+        conn = self.pool.connection()
+        marks = parse_event_id(last_event_id)
+        events = []
+        if marks is None:
+            marks = current_marks(conn)
+            state = fetch_latest_state(conn)
+            if state:
+                events.append(_event('state', state, format_event_id(marks)))
+        else:
+            events.extend(self._replay(conn, marks))
+        events.append('retry: 2000\n\n')
+        return events, marks
+
+    def _replay(self, conn: sqlite3.Connection, marks: Dict[str, int]) -> Iterator[str]:
+        """Events for rows after marks (newest state only), advancing marks in place"""
+        state = fetch_latest_state(conn)
+        if state and state['id'] > marks['state']:
+            marks['state'] = state['id']
+            yield _event('state', state, format_event_id(marks))
+
+        for kind in FEED_TABLES:
+            if kind == 'state':
+                continue
+            while True:
+                rows = fetch_after(conn, kind, marks[kind], self.replay_limit)
+                for row in rows:
+                    marks[kind] = row['id']
+                    yield _event(kind, row, format_event_id(marks))
+                if len(rows) < self.replay_limit:
+                    break
+
+
+def _event(kind: str, row: Dict, event_id: str) -> str:
+    return f"id: {event_id}\nevent: {kind}\ndata: {json.dumps(row, separators=(',', ':'))}\n\n"
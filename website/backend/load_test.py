@@ -0,0 +1,276 @@
+"""
+API Load Test
+
+Replays a weighted mix of website API requests against a running server
+(api_server.py or api_server_async.py) from N concurrent clients for a fixed
+duration, then reports throughput and p50/p95/p99 latency per endpoint.
+
+Results can be written as JSON (--json) and compared with an earlier run
+(--compare): any endpoint whose p95 regressed by more than --max-regression
+percent is listed and the exit status is 1, so a build can be gated on it.
+
+Usage:
+    python synthetic_db.py --db-path /tmp/load/game_data.db --snapshots 10000000 --days 120 --delta
+    python api_server_async.py --port 5000 --db-path /tmp/load/game_data.db
+    python load_test.py --url http://127.0.0.1:5000 --concurrency 64 --duration 60 --json run.json
+"""
+
+import json
+import logging
+import math
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import requests
+
+# name -> (weight, path); weights roughly follow the overlay and companion site
+DEFAULT_MIX = {
+    'current-state': (30, '/api/current-state'),
+    'stats-history-1h': (10, '/api/stats-history?hours=1&points=300'),
+    'stats-history-24h': (6, '/api/stats-history?hours=24&points=500'),
+    'stats-history-30d': (2, '/api/stats-history?hours=720'),
+    'skills-current': (6, '/api/skills-current'),
+    'milestones': (6, '/api/milestones?limit=50'),
+    'decisions': (6, '/api/decisions?limit=100'),
+    'items-collected': (4, '/api/items-collected?limit=100'),
+    'session-stats': (5, '/api/session-stats'),
+    'combat-stats': (5, '/api/combat-stats'),
+    'location-history': (4, '/api/location-history'),
+    'batch': (10, '/api/batch?resources=current-state,combat-stats,session-stats'),
+    'health': (2, '/api/health'),
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class LoadTest:
+    """Closed-loop load generator: each client sends its next request when the last returns"""
+
+    def __init__(self, base_url: str, mix: Dict[str, tuple], concurrency: int = 16,
+                 duration: float = 30.0, warmup: float = 5.0, bust_cache: bool = False,
+                 timeout: float = 30.0, seed: int = 13):
+        self.base_url = base_url.rstrip('/')
+        self.mix = mix
+        self.concurrency = concurrency
+        self.duration = duration
+        self.warmup = warmup
+        self.bust_cache = bust_cache
+        self.timeout = timeout
+        self.seed = seed
+
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {name: [] for name in mix}
+        self.statuses: Dict[str, Dict[str, int]] = {name: {} for name in mix}
+        self.bytes: Dict[str, int] = {name: 0 for name in mix}
+        self.recording = False
+        self.started_at = None
+
+    def run(self) -> dict:
+        """Warm up, measure for `duration` seconds, and return the results"""
+        self.started_at = datetime.utcnow()
+        stop_at = time.monotonic() + self.warmup + self.duration
+        measure_at = time.monotonic() + self.warmup
+        logging.info(f"{self.concurrency} clients, {self.warmup:.0f}s warmup + {self.duration:.0f}s "
+                     f"against {self.base_url}")
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            clients = [pool.submit(self.client, index, stop_at) for index in range(self.concurrency)]
+            time.sleep(max(measure_at - time.monotonic(), 0))
+            with self.lock:
+                self.recording = True
+            started = time.monotonic()
+            for client in clients:
+                client.result()
+            elapsed = time.monotonic() - started
+
+        return self.results(elapsed)
+
+    def client(self, index: int, stop_at: float):
+        rng = random.Random(self.seed + index)
+        names = list(self.mix)
+        weights = [self.mix[name][0] for name in names]
+        session = requests.Session()
+        sequence = 0
+
+        while time.monotonic() < stop_at:
+            name = rng.choices(names, weights)[0]
+            url = self.base_url + self.mix[name][1]
+            if self.bust_cache:
+                # Unknown params are ignored by the API but are part of the cache key
+                sequence += 1
+                url += ('&' if '?' in url else '?') + f"_={index}.{sequence}"
+
+            started = time.perf_counter()
+            try:
+                response = session.get(url, timeout=self.timeout)
+                size = len(response.content)
+                status = str(response.status_code)
+            except requests.RequestException as e:
+                size = 0
+                status = type(e).__name__
+            seconds = time.perf_counter() - started
+
+            with self.lock:
+                if self.recording:
+                    self.latencies[name].append(seconds)
+                    self.statuses[name][status] = self.statuses[name].get(status, 0) + 1
+                    self.bytes[name] += size
+
+    def results(self, elapsed: float) -> dict:
+        endpoints = {}
+        everything = []
+        for name, latencies in self.latencies.items():
+            latencies.sort()
+            everything.extend(latencies)
+            endpoints[name] = summarize(latencies, elapsed, self.statuses[name], self.bytes[name])
+            endpoints[name]['path'] = self.mix[name][1]
+
+        everything.sort()
+        statuses = {}
+        for counts in self.statuses.values():
+            for status, count in counts.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+        return {
+            'run': {
+                'started': self.started_at.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'commit': git_commit(),
+                'url': self.base_url,
+                'concurrency': self.concurrency,
+                'duration': round(elapsed, 3),
+                'warmup': self.warmup,
+                'bust_cache': self.bust_cache,
+                'server': server_info(self.base_url, self.timeout),
+            },
+            'total': summarize(everything, elapsed, statuses, sum(self.bytes.values())),
+            'endpoints': endpoints,
+        }
+
+
+def summarize(latencies: List[float], elapsed: float, statuses: Dict[str, int], size: int) -> dict:
+    """Throughput and latency (ms) for one sorted list of request times"""
+    count = len(latencies)
+    ok = sum(value for status, value in statuses.items() if status.startswith(('2', '3')))
+    return {
+        'requests': count,
+        'errors': count - ok,
+        'statuses': statuses,
+        'rps': round(count / elapsed, 2) if elapsed else 0.0,
+        'bytes': size,
+        'mean_ms': round(sum(latencies) / count * 1000, 3) if count else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3) if count else 0.0,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def server_info(base_url: str, timeout: float) -> Optional[dict]:
+    """/api/health of the server under test (row count tells which database it was)"""
+    try:
+        return requests.get(f"{base_url}/api/health", timeout=timeout).json()
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def parse_mix(value: str) -> Dict[str, tuple]:
+    """'current-state=50,batch=10' -> DEFAULT_MIX subset with those weights"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown endpoint {name!r}; choose from {', '.join(DEFAULT_MIX)}")
+        mix[name] = (float(weight or DEFAULT_MIX[name][0]), DEFAULT_MIX[name][1])
+    return mix
+
+
+def format_table(results: dict) -> str:
+    rows = [('endpoint', 'requests', 'errors', 'rps', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms')]
+    for name, stats in list(results['endpoints'].items()) + [('TOTAL', results['total'])]:
+        if stats['requests']:
+            rows.append((name, stats['requests'], stats['errors'], f"{stats['rps']:.1f}",
+                         f"{stats['p50_ms']:.1f}", f"{stats['p95_ms']:.1f}",
+                         f"{stats['p99_ms']:.1f}", f"{stats['max_ms']:.1f}"))
+    widths = [max(len(str(row[i])) for row in rows) for i in range(len(rows[0]))]
+    return '\n'.join(
+        '  '.join(str(cell).ljust(width) if i == 0 else str(cell).rjust(width)
+                  for i, (cell, width) in enumerate(zip(row, widths)))
+        for row in rows
+    )
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> List[str]:
+    """Endpoints whose p95 is more than max_regression percent slower than baseline"""
+    regressions = []
+    for name, stats in results['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if not before or not before.get('p95_ms') or not stats['requests']:
+            continue
+        change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100
+        if change > max_regression:
+            regressions.append(f"{name}: p95 {before['p95_ms']:.1f} -> {stats['p95_ms']:.1f} ms (+{change:.0f}%)")
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load test the website API")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="Base URL of the API server")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before that")
+    parser.add_argument("--mix", default=None,
+                        help=f"Endpoints and weights, e.g. current-state=50,batch=10 (default: all of "
+                             f"{', '.join(DEFAULT_MIX)})")
+    parser.add_argument("--bust-cache", action="store_true",
+                        help="Make every URL unique so the response cache never answers")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=13, help="Random seed for the request sequence")
+    parser.add_argument("--json", default=None, help="Write results here as JSON")
+    parser.add_argument("--compare", default=None, help="Baseline JSON from an earlier run")
+    parser.add_argument("--max-regression", type=float, default=20.0,
+                        help="Allowed p95 increase over the baseline, in percent")
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    test = LoadTest(args.url, mix, args.concurrency, args.duration, args.warmup,
+                    args.bust_cache, args.timeout, args.seed)
+    results = test.run()
+    print(format_table(results))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        logging.info(f"Results written to {args.json}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        if regressions:
+            print(f"\np95 regressions over {args.max_regression:.0f}% against {args.compare}:")
+            print('\n'.join(f"  {line}" for line in regressions))
+            sys.exit(1)
+        print(f"\nNo p95 regressions over {args.max_regression:.0f}% against {args.compare}")
@@ -0,0 +1,75 @@
+"""
+Map Visit Segments
+
+The collector records one map_visits row per continuous stay on a map: when the
+player entered, the last snapshot seen there, and the time spent. Snapshots on
+the same map as the current visit only extend it, so revisits show up as new
+rows and location history never has to group raw game_states.
+"""
+
+import sqlite3
+
+
+def create_table(cursor: sqlite3.Cursor):
+    """Create the map_visits table if it doesn't exist"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS map_visits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            map_name TEXT,
+            entered_at DATETIME,
+            exited_at DATETIME,
+            duration_seconds INTEGER,
+            enter_snapshot_id INTEGER REFERENCES game_states(id),
+            exit_snapshot_id INTEGER REFERENCES game_states(id)
+        )
+    ''')
+
+
+def record(cursor: sqlite3.Cursor, state_id: int, map_name: str, timestamp: str):
+    """Extend the visit in progress at this snapshot, or start a new one on a map change"""
+    cursor.execute('''
+        SELECT id, map_name FROM map_visits
+        WHERE entered_at <= ?
+        ORDER BY entered_at DESC, id DESC
+        LIMIT 1
+    ''', (timestamp,))
+    visit = cursor.fetchone()
+
+    if visit and visit[1] == map_name:
+        cursor.execute('''
+            UPDATE map_visits SET
+                exited_at = MAX(exited_at, ?),
+                exit_snapshot_id = CASE WHEN exited_at <= ? THEN ? ELSE exit_snapshot_id END,
+                duration_seconds = strftime('%s', MAX(exited_at, ?)) - strftime('%s', entered_at)
+            WHERE id = ?
+        ''', (timestamp, timestamp, state_id, timestamp, visit[0]))
+    else:
+        cursor.execute('''
+            INSERT INTO map_visits (map_name, entered_at, exited_at, duration_seconds,
+                                    enter_snapshot_id, exit_snapshot_id)
+            VALUES (?, ?, ?, 0, ?, ?)
+        ''', (map_name, timestamp, timestamp, state_id, state_id))
+
+
+def backfill(cursor: sqlite3.Cursor):
+    """Rebuild map_visits from the raw game_states rows still in the database"""
+    cursor.execute('DELETE FROM map_visits')
+    cursor.execute('''
+        INSERT INTO map_visits (map_name, entered_at, exited_at, duration_seconds,
+                                enter_snapshot_id, exit_snapshot_id)
+        SELECT
+            map_name, MIN(timestamp), MAX(timestamp),
+            strftime('%s', MAX(timestamp)) - strftime('%s', MIN(timestamp)),
+            MIN(id), MAX(id)
+        FROM (
+            SELECT id, timestamp, map_name,
+                   SUM(changed) OVER (ORDER BY timestamp, id) AS visit
+            FROM (
+                SELECT id, timestamp, map_name,
+                       map_name IS NOT LAG(map_name) OVER (ORDER BY timestamp, id) AS changed
+                FROM game_states
+            )
+        )
+        GROUP BY visit
+        ORDER BY visit
+    ''')
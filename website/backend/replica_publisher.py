@@ -0,0 +1,175 @@
+"""
+Read Replica Publisher
+
+Copies game_data.db into versioned, never-modified replica files with the
+SQLite online backup API, so API processes read their own immutable copy and
+never take a lock on the database the collector is writing. Each replica is
+written under a temporary name, renamed into place, and then announced by
+atomically replacing the CURRENT pointer file in the replica directory:
+
+    database/replicas/
+        CURRENT                 -> "game_data.1742.db"
+        game_data.1741.db
+        game_data.1742.db
+
+ReadOnlyConnectionPool(replica_dir=...) follows CURRENT and opens replicas
+with immutable=1 (no locking, no change detection). A replica is published
+only when the collector's data_version has moved; the newest `keep` replicas
+are kept so readers still on an older one can finish.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+POINTER_FILE = "CURRENT"
+
+
+def read_pointer(replica_dir: str) -> Optional[str]:
+    """Path of the current replica, or None if nothing has been published"""
+    try:
+        name = (Path(replica_dir) / POINTER_FILE).read_text().strip()
+    except FileNotFoundError:
+        return None
+    return str(Path(replica_dir) / name) if name else None
+
+
+def pointer_identity(replica_dir: str) -> Optional[Tuple[int, int]]:
+    """(inode, mtime_ns) of the pointer file; changes whenever a replica is published"""
+    try:
+        st = os.stat(Path(replica_dir) / POINTER_FILE)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns)
+
+
+class ReplicaPublisher:
+    """Publishes read-only copies of the collector's database"""
+
+    def __init__(self, db_path: str, replica_dir: str, interval: float = 10.0, keep: int = 3):
+        self.db_path = db_path
+        self.replica_dir = Path(replica_dir)
+        self.interval = interval
+        self.keep = max(keep, 1)
+
+        self.published_version = None
+        self.stopping = threading.Event()
+        self.thread = None
+
+        self.replica_dir.mkdir(parents=True, exist_ok=True)
+
+    def publish(self, force: bool = False) -> Optional[str]:
+        """Publish a replica if the data changed since the last one; returns its path"""
+        source = sqlite3.connect(Path(self.db_path).resolve().as_uri() + '?mode=ro', uri=True)
+        try:
+            version = self._data_version(source)
+            if not force and version is not None and version == self.published_version:
+                return None
+
+            stem = Path(self.db_path).stem
+            name = f"{stem}.{version if version is not None else int(time.time() * 1000)}.db"
+            path = self.replica_dir / name
+            tmp_path = self.replica_dir / f".{name}.tmp"
+
+            started = time.perf_counter()
+            target = sqlite3.connect(tmp_path)
+            try:
+                # One step: the whole copy reads a single WAL snapshot, so
+                # commits made meanwhile neither wait nor restart it
+                source.backup(target)
+                # A standalone file: no -wal/-shm needed next to the replica
+                target.execute('PRAGMA journal_mode = DELETE')
+            finally:
+                target.close()
+        finally:
+            source.close()
+
+        with open(tmp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._write_pointer(name)
+        self.published_version = version
+
+        logging.info(f"Published replica {path} ({os.path.getsize(path) / (1024 * 1024):.1f} MB "
+                     f"in {time.perf_counter() - started:.2f}s)")
+        self.prune()
+        return str(path)
+
+    def prune(self):
+        """Delete all but the newest `keep` replicas"""
+        current = read_pointer(str(self.replica_dir))
+        replicas = sorted(
+            (path for path in self.replica_dir.glob('*.db') if str(path) != current),
+            key=lambda path: path.stat().st_mtime_ns,
+        )
+        for path in replicas[:max(len(replicas) - (self.keep - 1), 0)]:
+            try:
+                path.unlink()
+            except OSError as e:
+                # e.g. still open by a reader on Windows; retried next publish
+                logging.debug(f"Could not remove old replica {path}: {e}")
+
+    def start(self):
+        """Publish every `interval` seconds from a daemon thread"""
+        self.thread = threading.Thread(target=self._run, name="replica-publisher", daemon=True)
+        self.thread.start()
+        logging.info(f"Publishing read replicas to {self.replica_dir} every {self.interval}s")
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _run(self):
+        while not self.stopping.is_set():
+            try:
+                self.publish()
+            except (sqlite3.Error, OSError) as e:
+                logging.error(f"Error publishing replica: {e}")
+            self.stopping.wait(self.interval)
+
+    def _write_pointer(self, name: str):
+        tmp_path = self.replica_dir / f".{POINTER_FILE}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(name + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.replica_dir / POINTER_FILE)
+
+    @staticmethod
+    def _data_version(conn: sqlite3.Connection) -> Optional[str]:
+        try:
+            row = conn.execute("SELECT value FROM collector_meta WHERE key = 'data_version'").fetchone()
+        except sqlite3.OperationalError:
+            return None  # Database predates collector_meta
+        return row[0] if row else None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Publish read-only replicas of the game database")
+    parser.add_argument("--db-path", default="./database/game_data.db", help="Path to SQLite database")
+    parser.add_argument("--replica-dir", default="./database/replicas", help="Where replicas are published")
+    parser.add_argument("--interval", type=float, default=10.0, help="Seconds between publishes")
+    parser.add_argument("--keep", type=int, default=3, help="Replicas to keep")
+    parser.add_argument("--once", action="store_true", help="Publish one replica and exit")
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    publisher = ReplicaPublisher(args.db_path, args.replica_dir, args.interval, args.keep)
+    if args.once:
+        publisher.publish(force=True)
+    else:
+        publisher.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            publisher.stop()
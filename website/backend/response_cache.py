@@ -0,0 +1,112 @@
+"""
+Snapshot-Versioned Response Cache for the API Server
+
+Database-backed endpoints only change when the collector commits, and every
+commit that writes rows advances collector_meta 'data_version'. Responses are
+cached under (endpoint, query args, data_version) in a bounded LRU, served with
+ETag and Last-Modified headers, and repeat polls are answered from memory (or
+with a 304) until the next commit.
+
+Checking the version is a PRAGMA data_version on the thread's pooled
+connection; collector_meta is only re-read when that counter moves.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Hashable, NamedTuple, Optional, Tuple
+
+
+class DataVersion(NamedTuple):
+    number: str
+    modified: Optional[datetime]
+
+
+class CachedResponse(NamedTuple):
+    version: str
+    body: bytes
+    status: int
+    headers: Tuple[Tuple[str, str], ...]
+    etag: str
+    last_modified: Optional[datetime]
+    stored: float
+
+
+class ResponseCache:
+    """Bounded LRU of rendered responses, invalidated by the collector's data_version"""
+
+    def __init__(self, max_entries: int = 1024, max_age: float = 60.0):
+        self.max_entries = max_entries
+        # Relative windows ("last hour") slide even when nothing is committed
+        self.max_age = max_age
+
+        self.entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+        self.hits = 0
+        self.misses = 0
+
+    def data_version(self, conn: sqlite3.Connection) -> Optional[DataVersion]:
+        """Latest committed data version, or None if the collector doesn't record one"""
+        # data_version changes whenever another connection commits to the file
+        pragma_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        known = getattr(self.local, 'known', None)
+        if known and known[0] is conn and known[1] == pragma_version:
+            return known[2]
+
+        try:
+            rows = dict(conn.execute('''
+                SELECT key, value FROM collector_meta
+                WHERE key IN ('data_version', 'data_modified')
+            ''').fetchall())
+        except sqlite3.OperationalError:
+            rows = {}  # Database predates collector_meta
+
+        version = None
+        if 'data_version' in rows:
+            modified = None
+            if rows.get('data_modified'):
+                modified = datetime.strptime(rows['data_modified'], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+            version = DataVersion(rows['data_version'], modified)
+
+        self.local.known = (conn, pragma_version, version)
+        return version
+
+    def get(self, key: Hashable, version: DataVersion) -> Optional[CachedResponse]:
+        """Cached response for key at this version, if still fresh"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if (entry is None or entry.version != version.number
+                    or time.monotonic() - entry.stored > self.max_age):
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, version: DataVersion, body: bytes, status: int,
+            headers: Dict[str, str]) -> CachedResponse:
+        """Store a rendered response, evicting the least recently used entries"""
+        entry = CachedResponse(
+            version=version.number,
+            body=body,
+            status=status,
+            headers=tuple(headers.items()),
+            etag=hashlib.sha1(body).hexdigest(),
+            last_modified=version.modified,
+            stored=time.monotonic(),
+        )
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
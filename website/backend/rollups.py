@@ -0,0 +1,333 @@
+"""
+Time-Series Rollups for game_states
+
+The collector writes one game_states row per second. Alongside each insert it
+upserts per-minute and per-hour aggregates (HP, level, XP, AC, combat time,
+kills, damage), so history queries over long windows read a few hundred
+pre-aggregated rows instead of scanning raw snapshots. Once rolled up, raw
+game_states and session_stats rows older than the retention window can be pruned,
+together with their inventory and skill rows.
+
+Whole-run totals (days played, max level, combat time, HP-in-combat mean) live
+in the single-row session_summary table, and kill counts in kill_steps, which
+only gets a row when the count changes.
+"""
+
+import logging
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+# resolution -> (table, strftime bucket format, seconds per bucket)
+ROLLUPS = {
+    'minute': ('game_states_1m', '%Y-%m-%d %H:%M:00', 60),
+    'hour': ('game_states_1h', '%Y-%m-%d %H:00:00', 3600),
+}
+
+# Longest window (hours) served at each resolution; longer windows use 'hour'
+RAW_MAX_HOURS = 2
+MINUTE_MAX_HOURS = 72
+
+_AGGREGATE_COLUMNS = '''
+    bucket DATETIME PRIMARY KEY,
+    samples INTEGER,
+    hp_sum INTEGER,
+    hp_low INTEGER,
+    hp_high INTEGER,
+    hp_max INTEGER,
+    level INTEGER,
+    experience INTEGER,
+    ac_sum INTEGER,
+    combat_samples INTEGER,
+    combat_hp_pct_sum REAL,
+    combat_hp_samples INTEGER,
+    kills INTEGER,
+    damage INTEGER
+'''
+
+
+def create_tables(cursor: sqlite3.Cursor):
+    """Create the rollup tables if they don't exist"""
+    for table, _, _ in ROLLUPS.values():
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {table} ({_AGGREGATE_COLUMNS})')
+    
+    # Whole-run totals in a single row, so summary endpoints never scan history
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS session_summary (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            days_played INTEGER,
+            max_level INTEGER,
+            total_xp INTEGER,
+            total_snapshots INTEGER,
+            combat_encounters INTEGER,
+            combat_hp_pct_sum REAL,
+            combat_hp_samples INTEGER,
+            total_kills INTEGER,
+            total_damage INTEGER
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS played_days (
+            day DATE PRIMARY KEY
+        )
+    ''')
+    
+    # Kill count only when it changes
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS kill_steps (
+            timestamp DATETIME PRIMARY KEY,
+            total_kills INTEGER
+        )
+    ''')
+
+
+def record(cursor: sqlite3.Cursor, state_id: int, kills: int, damage: int):
+    """Fold one freshly inserted game_states row into every rollup"""
+    for table, bucket_format, _ in ROLLUPS.values():
+        cursor.execute(f'''
+            INSERT INTO {table} (
+                bucket, samples, hp_sum, hp_low, hp_high, hp_max, level, experience,
+                ac_sum, combat_samples, combat_hp_pct_sum, combat_hp_samples, kills, damage
+            )
+            SELECT
+                strftime('{bucket_format}', timestamp), 1, hp_current, hp_current, hp_current,
+                hp_max, level, experience, armor_class, in_combat = 1,
+                CASE WHEN in_combat = 1 AND hp_max > 0 THEN hp_current * 100.0 / hp_max ELSE 0 END,
+                in_combat = 1 AND hp_max > 0, ?, ?
+            FROM game_states WHERE id = ?
+            ON CONFLICT(bucket) DO UPDATE SET
+                samples = samples + 1,
+                hp_sum = hp_sum + excluded.hp_sum,
+                hp_low = MIN(hp_low, excluded.hp_low),
+                hp_high = MAX(hp_high, excluded.hp_high),
+                hp_max = MAX(hp_max, excluded.hp_max),
+                level = MAX(level, excluded.level),
+                experience = MAX(experience, excluded.experience),
+                ac_sum = ac_sum + excluded.ac_sum,
+                combat_samples = combat_samples + excluded.combat_samples,
+                combat_hp_pct_sum = combat_hp_pct_sum + excluded.combat_hp_pct_sum,
+                combat_hp_samples = combat_hp_samples + excluded.combat_hp_samples,
+                kills = MAX(kills, excluded.kills),
+                damage = MAX(damage, excluded.damage)
+        ''', (kills, damage, state_id))
+    
+    record_summary(cursor, state_id, kills, damage)
+
+
+def record_summary(cursor: sqlite3.Cursor, state_id: int, kills: int, damage: int):
+    """Fold one game_states row into session_summary and kill_steps"""
+    new_day = cursor.execute('''
+        INSERT OR IGNORE INTO played_days (day)
+        SELECT DATE(timestamp) FROM game_states WHERE id = ?
+    ''', (state_id,)).rowcount
+    
+    cursor.execute('''
+        INSERT INTO session_summary (
+            id, days_played, max_level, total_xp, total_snapshots, combat_encounters,
+            combat_hp_pct_sum, combat_hp_samples, total_kills, total_damage
+        )
+        SELECT
+            1, ?, level, experience, 1, in_combat = 1,
+            CASE WHEN in_combat = 1 AND hp_max > 0 THEN hp_current * 100.0 / hp_max ELSE 0 END,
+            in_combat = 1 AND hp_max > 0, ?, ?
+        FROM game_states WHERE id = ?
+        ON CONFLICT(id) DO UPDATE SET
+            days_played = days_played + excluded.days_played,
+            max_level = MAX(max_level, excluded.max_level),
+            total_xp = MAX(total_xp, excluded.total_xp),
+            total_snapshots = total_snapshots + 1,
+            combat_encounters = combat_encounters + excluded.combat_encounters,
+            combat_hp_pct_sum = combat_hp_pct_sum + excluded.combat_hp_pct_sum,
+            combat_hp_samples = combat_hp_samples + excluded.combat_hp_samples,
+            total_kills = MAX(total_kills, excluded.total_kills),
+            total_damage = MAX(total_damage, excluded.total_damage)
+    ''', (new_day, kills, damage, state_id))
+    
+    # New step only if the count differs from the one in effect at this time
+    cursor.execute('''
+        INSERT INTO kill_steps (timestamp, total_kills)
+        SELECT timestamp, ? FROM game_states
+        WHERE id = ? AND ? IS NOT (
+            SELECT total_kills FROM kill_steps
+            WHERE kill_steps.timestamp <= game_states.timestamp
+            ORDER BY kill_steps.timestamp DESC LIMIT 1
+        )
+        ON CONFLICT(timestamp) DO UPDATE SET total_kills = MAX(total_kills, excluded.total_kills)
+    ''', (kills, state_id, kills))
+
+
+def backfill(cursor: sqlite3.Cursor):
+    """Rebuild every rollup from the raw game_states and session_stats rows"""
+    for table, bucket_format, _ in ROLLUPS.values():
+        cursor.execute(f'DELETE FROM {table}')
+        # Both sides grouped once by bucket, then joined
+        cursor.execute(f'''
+            INSERT INTO {table} (
+                bucket, samples, hp_sum, hp_low, hp_high, hp_max, level, experience,
+                ac_sum, combat_samples, combat_hp_pct_sum, combat_hp_samples, kills, damage
+            )
+            SELECT states.*, COALESCE(sessions.kills, 0), COALESCE(sessions.damage, 0)
+            FROM (
+                SELECT
+                    strftime('{bucket_format}', timestamp) AS bucket, COUNT(*), SUM(hp_current),
+                    MIN(hp_current), MAX(hp_current), MAX(hp_max), MAX(level), MAX(experience),
+                    SUM(armor_class), SUM(in_combat = 1),
+                    SUM(CASE WHEN in_combat = 1 AND hp_max > 0 THEN hp_current * 100.0 / hp_max ELSE 0 END),
+                    SUM(in_combat = 1 AND hp_max > 0)
+                FROM game_states
+                GROUP BY 1
+            ) states
+            LEFT JOIN (
+                SELECT strftime('{bucket_format}', timestamp) AS bucket,
+                       MAX(total_kills) AS kills, MAX(total_damage) AS damage
+                FROM session_stats
+                GROUP BY 1
+            ) sessions ON sessions.bucket = states.bucket
+        ''')
+
+
+def backfill_summary(cursor: sqlite3.Cursor):
+    """Rebuild session_summary and kill_steps from the rollups (which outlive raw rows)"""
+    cursor.execute('DELETE FROM played_days')
+    cursor.execute('''
+        INSERT INTO played_days (day)
+        SELECT DISTINCT DATE(bucket) FROM game_states_1h
+    ''')
+    
+    cursor.execute('DELETE FROM session_summary')
+    cursor.execute('''
+        INSERT INTO session_summary (
+            id, days_played, max_level, total_xp, total_snapshots, combat_encounters,
+            combat_hp_pct_sum, combat_hp_samples, total_kills, total_damage
+        )
+        SELECT
+            1, (SELECT COUNT(*) FROM played_days), MAX(level), MAX(experience), SUM(samples),
+            SUM(combat_samples), SUM(combat_hp_pct_sum), SUM(combat_hp_samples),
+            MAX(kills), MAX(damage)
+        FROM game_states_1h
+        HAVING COUNT(*) > 0
+    ''')
+    
+    cursor.execute('DELETE FROM kill_steps')
+    cursor.execute('''
+        INSERT INTO kill_steps (timestamp, total_kills)
+        SELECT bucket, kills FROM (
+            SELECT bucket, kills, LAG(kills) OVER (ORDER BY bucket) AS previous
+            FROM game_states_1m
+        )
+        WHERE kills IS NOT previous
+    ''')
+
+
+def prune(cursor: sqlite3.Cursor, retention_days: float) -> Dict[str, int]:
+    """Delete raw snapshots older than the retention window with their child rows"""
+    # Never delete past the newest hour bucket, so unrolled rows survive
+    cutoff = f"-{float(retention_days):f} days"
+    cursor.execute('CREATE TEMP TABLE IF NOT EXISTS pruned_snapshots (id INTEGER PRIMARY KEY)')
+    cursor.execute('DELETE FROM pruned_snapshots')
+    cursor.execute('''
+        INSERT INTO pruned_snapshots (id)
+        SELECT id FROM game_states
+        WHERE timestamp < datetime('now', ?)
+          AND timestamp < (SELECT COALESCE(MAX(bucket), '') FROM game_states_1h)
+    ''', (cutoff,))
+    
+    pruned = {}
+    for table in ('inventory_snapshots', 'skills'):
+        pruned[table] = cursor.execute(f'''
+            DELETE FROM {table} WHERE snapshot_id IN (SELECT id FROM pruned_snapshots)
+        ''').rowcount
+    
+    # Delta rows: each item's/skill's last change among the pruned snapshots
+    # becomes the base later snapshots are rebuilt from. Everything older for
+    # that key goes, including bases kept by earlier prunes, and so does the
+    # base itself if it's a removal.
+    for table, key, removed in (('inventory_changes', 'item_pid', 'quantity = 0'),
+                                ('skill_changes', 'skill_name', '0')):
+        pruned[table] = cursor.execute(f'''
+            DELETE FROM {table} WHERE id IN (
+                SELECT c.id FROM {table} c
+                JOIN (
+                    SELECT b.{key} AS key, b.id, b.snapshot_id, {removed} AS removal
+                    FROM {table} b
+                    JOIN (
+                        SELECT MAX(id) AS id FROM {table}
+                        WHERE snapshot_id IN (SELECT id FROM pruned_snapshots)
+                        GROUP BY {key}
+                    ) latest ON latest.id = b.id
+                ) base ON base.key = c.{key}
+                WHERE c.snapshot_id < base.snapshot_id OR (base.removal AND c.id = base.id)
+            )
+        ''').rowcount
+    
+    pruned['game_states'] = cursor.execute('''
+        DELETE FROM game_states WHERE id IN (SELECT id FROM pruned_snapshots)
+    ''').rowcount
+    pruned['session_stats'] = cursor.execute('''
+        DELETE FROM session_stats
+        WHERE timestamp < datetime('now', ?)
+          AND timestamp < (SELECT COALESCE(MAX(bucket), '') FROM game_states_1h)
+    ''', (cutoff,)).rowcount
+    cursor.execute('DELETE FROM pruned_snapshots')
+    
+    if any(pruned.values()):
+        logging.info(f"Pruned rows older than {retention_days} days: "
+                     + ', '.join(f"{count} {table}" for table, count in pruned.items()))
+    return pruned
+
+
+def choose_resolution(cursor: sqlite3.Cursor, hours: float, points: Optional[int] = None) -> str:
+    """Coarsest resolution that still gives a useful number of points for the window"""
+    if points:
+        # Coarsest rollup with at least `points` buckets in the window, else raw
+        for resolution in ('hour', 'minute'):
+            if hours * 3600 / ROLLUPS[resolution][2] >= points:
+                return resolution
+    elif hours > MINUTE_MAX_HOURS:
+        return 'hour'
+    elif hours > RAW_MAX_HOURS:
+        return 'minute'
+
+    # Raw rows may have been pruned; fall back to rollups if the window starts
+    # before the oldest raw row and the rollups reach further back
+    cursor.execute('''
+        SELECT oldest_raw > datetime('now', '-' || ? || ' hours')
+           AND (SELECT MIN(bucket) FROM game_states_1m) < strftime('%Y-%m-%d %H:%M:00', oldest_raw)
+        FROM (SELECT COALESCE(MIN(timestamp), '9999-12-31') AS oldest_raw FROM game_states)
+    ''', (hours,))
+    pruned = cursor.fetchone()[0]
+    return 'minute' if pruned else 'raw'
+
+
+def history(cursor: sqlite3.Cursor, hours: float, resolution: Optional[str] = None,
+            points: Optional[int] = None) -> Tuple[str, List[Dict]]:
+    """Stats history for the last N hours as (resolution, rows)"""
+    if resolution not in ('raw', *ROLLUPS):
+        resolution = choose_resolution(cursor, hours, points)
+
+    if resolution == 'raw':
+        cursor.execute('''
+            SELECT timestamp, hp_current, hp_max, level, experience, armor_class
+            FROM game_states
+            WHERE timestamp >= datetime('now', '-' || ? || ' hours')
+            ORDER BY timestamp ASC
+        ''', (hours,))
+        return resolution, _rows_as_dicts(cursor)
+
+    table, bucket_format, _ = ROLLUPS[resolution]
+    cursor.execute(f'''
+        SELECT
+            bucket AS timestamp,
+            CAST(ROUND(hp_sum * 1.0 / samples) AS INTEGER) AS hp_current,
+            hp_max, level, experience,
+            CAST(ROUND(ac_sum * 1.0 / samples) AS INTEGER) AS armor_class,
+            hp_low, hp_high, samples
+        FROM {table}
+        WHERE bucket >= strftime('{bucket_format}', datetime('now', '-' || ? || ' hours'))
+        ORDER BY bucket ASC
+    ''', (hours,))
+    return resolution, _rows_as_dicts(cursor)
+
+
+def _rows_as_dicts(cursor: sqlite3.Cursor) -> List[Dict]:
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
@@ -0,0 +1,340 @@
+"""
+Synthetic Game Database Generator
+
+Builds a game_data.db of any size for load testing the API: one game_states
+row per second of simulated play, with the inventory/skills snapshots (or
+delta rows), session stats, decisions, milestones and items collected the
+collector would have written, followed by the rollups, summary tables and map
+visits. A seeded random walk drives the character through maps, combat, kills,
+XP and loot, so indexes, rollups and downsampling see realistic distributions.
+
+Play is split into one session per day over --days, ending at --end (default
+now, so the "last N hours" endpoints have data). The same --seed and --end give
+the same database. Rows are bulk-inserted with secondary indexes dropped, as
+backfill.py does.
+
+Usage:
+    python synthetic_db.py --db-path /tmp/load/game_data.db --snapshots 1000000 --days 60
+"""
+
+import calendar
+import logging
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime
+from typing import List, Optional
+
+import map_visits
+import rollups
+from data_collector import GameDataCollector
+
+MAPS = (
+    'V13ENT', 'V13_1', 'V13_2', 'DESERT1', 'SHADYE', 'SHADYW', 'RAIDERS', 'VAULT15',
+    'JUNKENT', 'JUNKKILL', 'HUBENT', 'HUBDWNTN', 'HUBHEIGT', 'HUBOLDTN', 'BROHDENT',
+    'BROHD12', 'HALLDED', 'NECROP', 'GLOWENT', 'CHILDRN1', 'MBENT', 'MSTRLR12',
+)
+
+SKILLS = (
+    'Small Guns', 'Big Guns', 'Energy Weapons', 'Unarmed', 'Melee Weapons', 'Throwing',
+    'First Aid', 'Doctor', 'Sneak', 'Lockpick', 'Steal', 'Traps', 'Science', 'Repair',
+    'Speech', 'Barter', 'Gambling', 'Outdoorsman',
+)
+
+# (pid, name) the character can pick up
+ITEMS = (
+    (40, 'Stimpak'), (41, 'Bottle Caps'), (8, '10mm Pistol'), (29, '10mm JHP'),
+    (4, 'Knife'), (5, 'Club'), (9, 'Hunting Rifle'), (35, '.223 FMJ'), (1, 'Leather Armor'),
+    (2, 'Metal Armor'), (48, 'Rad-X'), (49, 'RadAway'), (53, 'Flare'), (81, 'Rope'),
+    (100, 'Geiger Counter'), (54, 'Motion Sensor'), (103, 'Nuka-Cola'), (110, 'Iguana-on-a-stick'),
+)
+
+ACTIONS = (
+    ('move', '', 'ok'), ('attack', 'Radscorpion', 'hit'), ('attack', 'Raider', 'miss'),
+    ('use_item', 'Stimpak', 'healed'), ('talk', 'Killian', 'dialogue'), ('pickup', 'Bottle Caps', 'ok'),
+    ('use_skill', 'Lockpick', 'success'), ('attack', 'Giant Rat', 'killed'),
+)
+
+QUEST_STEPS = (
+    'Found the water chip lead', 'Rescued Tandi', 'Killed the radscorpions', 'Joined the Brotherhood',
+    'Destroyed the Master', 'Cleared the raider camp', 'Delivered the holodisk', 'Fixed the water pump',
+)
+
+BATCH_SNAPSHOTS = 5000
+
+
+def xp_for_level(level: int) -> int:
+    """Experience needed to reach level (Fallout's n(n-1)/2 * 1000 curve)"""
+    return level * (level - 1) // 2 * 1000
+
+
+class SyntheticDatabase:
+    """Simulates a long run and bulk-writes it through a GameDataCollector connection"""
+
+    def __init__(self, db_path: str, snapshots: int, days: float = 30.0,
+                 end: Optional[datetime] = None, delta: bool = False, seed: int = 13):
+        if os.path.exists(db_path):
+            raise RuntimeError(f"{db_path} already exists; the generator only writes new databases")
+
+        self.snapshots = snapshots
+        self.days = max(int(days), 1)
+        self.play_seconds = -(-snapshots // self.days)  # Per day, rounded up
+        if self.play_seconds > 86400:
+            raise ValueError(f"{snapshots} one-second snapshots don't fit in {self.days} days; "
+                             f"use --days {-(-snapshots // 86400)} or more")
+
+        end = end or datetime.utcnow()
+        self.end_epoch = calendar.timegm(end.timetuple())
+        self.delta = delta
+        self.random = random.Random(seed)
+
+        self.collector = GameDataCollector(".", db_path, delta=delta)
+        self.conn = self.collector.conn
+
+        # Character state carried across snapshots
+        self.hp = self.hp_max = 30
+        self.level = 1
+        self.experience = 0
+        self.armor_class = 5
+        self.kills = 0
+        self.damage = 0
+        self.session_time = 0
+        self.map_name = MAPS[0]
+        self.map_left = 0
+        self.combat_left = 0
+        self.visited = set()
+        self.inventory = {pid: (name, 1) for pid, name in ITEMS[:4]}
+        self.skills = {name: self.random.randint(10, 45) for name in SKILLS}
+        self.written_inventory = {}
+        self.written_skills = {}
+
+    def run(self):
+        """Generate every snapshot, then rebuild derived tables and indexes"""
+        conn = self.conn
+        cursor = conn.cursor()
+        started = time.monotonic()
+
+        conn.execute('PRAGMA synchronous = OFF')
+        conn.execute('BEGIN')
+        self.collector.drop_indexes(cursor)
+        conn.execute('COMMIT')
+
+        state_id = 0
+        batch = self.empty_batch()
+        for epoch in self.timeline():
+            state_id += 1
+            self.simulate(batch, state_id, self.timestamp(epoch), epoch)
+            if state_id % BATCH_SNAPSHOTS == 0:
+                self.write(cursor, batch)
+                batch = self.empty_batch()
+            if state_id % (BATCH_SNAPSHOTS * 100) == 0:
+                self.report(state_id, started)
+        self.write(cursor, batch)
+
+        logging.info("Rebuilding rollups, summary and map visits...")
+        conn.execute('BEGIN')
+        self.collector.create_indexes(cursor)
+        rollups.backfill(cursor)
+        rollups.backfill_summary(cursor)
+        map_visits.backfill(cursor)
+        self.collector.bump_data_version()
+        conn.execute('COMMIT')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute('ANALYZE')
+
+        self.report(state_id, started)
+        self.collector.close()
+
+    def timeline(self):
+        """Epoch seconds of every snapshot: one contiguous session per day"""
+        remaining = self.snapshots
+        first_day = self.end_epoch - self.days * 86400
+        for day in range(self.days):
+            count = min(self.play_seconds, remaining)
+            if count <= 0:
+                return
+            start = first_day + day * 86400 + self.random.randint(0, 86400 - count)
+            yield from range(start, start + count)
+            remaining -= count
+
+    @staticmethod
+    def timestamp(epoch: int) -> str:
+        return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(epoch))
+
+    @staticmethod
+    def empty_batch():
+        return {table: [] for table in (
+            'game_states', 'inventory', 'skills', 'session_stats',
+            'decisions', 'milestones', 'items_collected',
+        )}
+
+    def simulate(self, batch, state_id: int, timestamp: str, epoch: int):
+        """Advance the character one second and queue the rows that produces"""
+        rng = self.random
+        self.session_time += 1
+
+        # Travel
+        if self.map_left <= 0 and self.combat_left <= 0:
+            self.map_name = rng.choice(MAPS)
+            self.map_left = rng.randint(300, 2400)
+            if self.map_name not in self.visited:
+                self.visited.add(self.map_name)
+                batch['milestones'].append((timestamp, f"Discovered {self.map_name}", self.map_name))
+        self.map_left -= 1
+
+        # Combat: HP drops, kills and XP come in bursts
+        if self.combat_left <= 0 and rng.random() < 1 / 400:
+            self.combat_left = rng.randint(20, 120)
+        in_combat = self.combat_left > 0
+        if in_combat:
+            self.combat_left -= 1
+            if rng.random() < 0.2:
+                self.hp = max(self.hp - rng.randint(1, 8), 1)
+            if rng.random() < 0.1:
+                self.damage += rng.randint(5, 25)
+            if rng.random() < 0.03:
+                self.kills += 1
+                self.experience += rng.randint(25, 150)
+        elif self.hp < self.hp_max and rng.random() < 0.05:
+            self.hp += 1
+
+        # Level ups raise max HP and skills
+        while self.experience >= xp_for_level(self.level + 1):
+            self.level += 1
+            self.hp_max += rng.randint(3, 8)
+            self.hp = self.hp_max
+            for name in rng.sample(SKILLS, 3):
+                self.skills[name] += rng.randint(2, 10)
+            batch['milestones'].append((timestamp, f"Reached level {self.level}", self.map_name))
+
+        # Quest progress
+        if rng.random() < 1 / 5000:
+            batch['milestones'].append((timestamp, f"{rng.choice(QUEST_STEPS)} ({self.map_name})", self.map_name))
+
+        # Loot
+        if rng.random() < 1 / 600:
+            pid, name = rng.choice(ITEMS)
+            quantity = rng.randint(1, 20) if name in ('Bottle Caps', '10mm JHP', '.223 FMJ') else 1
+            self.inventory[pid] = (name, self.inventory.get(pid, (name, 0))[1] + quantity)
+            if name.endswith('Armor'):
+                self.armor_class = max(self.armor_class, 15 if name.startswith('Metal') else 10)
+            batch['items_collected'].append((timestamp, pid, name, quantity, self.map_name))
+        elif self.inventory and rng.random() < 1 / 1200:
+            pid = rng.choice(list(self.inventory))
+            name, quantity = self.inventory[pid]
+            if quantity > 1:
+                self.inventory[pid] = (name, quantity - 1)
+            else:
+                del self.inventory[pid]
+
+        # AI decisions (ai_memory.json), at most one per second
+        if rng.random() < (0.5 if in_combat else 0.1):
+            action, target, result = rng.choice(ACTIONS)
+            batch['decisions'].append((timestamp, self.map_name, rng.randint(0, 40000), 0, action, target, result))
+
+        batch['game_states'].append((
+            state_id, timestamp, self.hp, self.hp_max, rng.randint(0, 8) if in_combat else 8, 8,
+            self.level, self.experience, self.armor_class, self.map_name, rng.randint(0, 40000), 0,
+            in_combat, self.session_time, 'none', 'none',
+        ))
+        batch['session_stats'].append((state_id, timestamp, self.kills, self.damage, self.session_time))
+        self.queue_inventory_and_skills(batch, state_id, timestamp)
+
+    def queue_inventory_and_skills(self, batch, state_id: int, timestamp: str):
+        if not self.delta:
+            batch['inventory'].extend(
+                (state_id, timestamp, pid, name, quantity) for pid, (name, quantity) in self.inventory.items())
+            batch['skills'].extend(
+                (state_id, timestamp, name, value) for name, value in self.skills.items())
+            return
+
+        # Delta mode: only what changed, quantity 0 for items that left
+        for pid, item in self.inventory.items():
+            if self.written_inventory.get(pid) != item:
+                batch['inventory'].append((state_id, timestamp, pid, item[0], item[1]))
+        for pid, (name, _) in self.written_inventory.items():
+            if pid not in self.inventory:
+                batch['inventory'].append((state_id, timestamp, pid, name, 0))
+        for name, value in self.skills.items():
+            if self.written_skills.get(name) != value:
+                batch['skills'].append((state_id, timestamp, name, value))
+        self.written_inventory = dict(self.inventory)
+        self.written_skills = dict(self.skills)
+
+    def write(self, cursor: sqlite3.Cursor, batch):
+        inventory_table, skills_table = (
+            ('inventory_changes', 'skill_changes') if self.delta else ('inventory_snapshots', 'skills'))
+
+        self.conn.execute('BEGIN')
+        cursor.executemany('''
+            INSERT INTO game_states (
+                id, timestamp, hp_current, hp_max, ap_current, ap_max, level, experience,
+                armor_class, map_name, tile, elevation, in_combat, session_time,
+                last_action, last_action_result
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', batch['game_states'])
+        cursor.executemany(f'''
+            INSERT INTO {inventory_table} (snapshot_id, timestamp, item_pid, item_name, quantity)
+            VALUES (?, ?, ?, ?, ?)
+        ''', batch['inventory'])
+        cursor.executemany(f'''
+            INSERT INTO {skills_table} (snapshot_id, timestamp, skill_name, skill_value)
+            VALUES (?, ?, ?, ?)
+        ''', batch['skills'])
+        cursor.executemany('''
+            INSERT INTO session_stats (snapshot_id, timestamp, total_kills, total_damage, session_time)
+            VALUES (?, ?, ?, ?, ?)
+        ''', batch['session_stats'])
+        cursor.executemany('''
+            INSERT OR IGNORE INTO decisions (timestamp, map_name, tile, elevation, action, target, result)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', batch['decisions'])
+        cursor.executemany('''
+            INSERT OR IGNORE INTO milestones (timestamp, description, location)
+            VALUES (?, ?, ?)
+        ''', batch['milestones'])
+        cursor.executemany('''
+            INSERT OR IGNORE INTO items_collected (timestamp, item_pid, item_name, quantity, location)
+            VALUES (?, ?, ?, ?, ?)
+        ''', batch['items_collected'])
+        self.conn.execute('COMMIT')
+
+    def report(self, written: int, started: float):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        logging.info(f"{written}/{self.snapshots} snapshots in {elapsed:.1f}s "
+                     f"({written / elapsed:.0f} snapshots/sec)")
+
+
+def table_counts(db_path: str, tables: List[str]) -> dict:
+    """Row counts, for logging what was generated"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] for table in tables}
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic game_data.db for load testing")
+    parser.add_argument("--db-path", required=True, help="Database to create (must not exist)")
+    parser.add_argument("--snapshots", type=int, default=1_000_000, help="game_states rows (one per played second)")
+    parser.add_argument("--days", type=float, default=30.0, help="Calendar days the play is spread over")
+    parser.add_argument("--end", default=None, help="Play ends before this date, YYYY-MM-DD (default: now)")
+    parser.add_argument("--delta", action="store_true",
+                        help="Store inventory/skill changes only, like data_collector.py --delta")
+    parser.add_argument("--seed", type=int, default=13, help="Random seed (same seed and --end, same database)")
+
+    args = parser.parse_args()
+
+    end = datetime.strptime(args.end, '%Y-%m-%d') if args.end else None
+    generator = SyntheticDatabase(args.db_path, args.snapshots, args.days, end, args.delta, args.seed)
+    generator.run()
+    for table, count in table_counts(args.db_path, [
+        'game_states', 'inventory_changes' if args.delta else 'inventory_snapshots',
+        'skill_changes' if args.delta else 'skills', 'decisions', 'milestones',
+        'items_collected', 'map_visits', 'game_states_1m', 'game_states_1h',
+    ]).items():
+        logging.info(f"  {table}: {count} rows")
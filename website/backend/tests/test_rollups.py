@@ -0,0 +1,144 @@
+"""
+Tests for the rollups retention policy
+
+Run from website/backend:
+    python -m unittest discover tests
+"""
+
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import delta_store
+import rollups
+from data_collector import GameDataCollector
+from synthetic_db import SyntheticDatabase
+
+CHILD_TABLES = ('inventory_snapshots', 'skills', 'inventory_changes', 'skill_changes', 'session_stats')
+
+
+class PruneTest(unittest.TestCase):
+    """prune() removes pruned snapshots' child rows and nothing later snapshots need"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def generate(self, delta: bool) -> sqlite3.Connection:
+        db_path = str(Path(self.tmp.name) / 'game_data.db')
+        # Ten days of play ending now, one short session per day
+        SyntheticDatabase(db_path, 2000, days=10, end=datetime.utcnow(), delta=delta).run()
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        self.addCleanup(conn.close)
+        return conn
+
+    def counts(self, conn: sqlite3.Connection) -> dict:
+        return {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for table in ('game_states',) + CHILD_TABLES}
+
+    def orphans(self, conn: sqlite3.Connection, table: str) -> int:
+        return conn.execute(f'''
+            SELECT COUNT(*) FROM {table}
+            WHERE snapshot_id NOT IN (SELECT id FROM game_states)
+        ''').fetchone()[0]
+
+    def prune(self, conn: sqlite3.Connection, retention_days: float) -> dict:
+        conn.execute('BEGIN')
+        pruned = rollups.prune(conn.cursor(), retention_days)
+        conn.execute('COMMIT')
+        return pruned
+
+    def test_full_mode_deletes_child_rows(self):
+        conn = self.generate(delta=False)
+        oldest_kept = conn.execute('''
+            SELECT MIN(id) FROM game_states WHERE timestamp >= datetime('now', '-5 days')
+        ''').fetchone()[0]
+        survivors = {
+            table: conn.execute(f'SELECT COUNT(*) FROM {table} WHERE snapshot_id >= ?',
+                                (oldest_kept,)).fetchone()[0]
+            for table in ('inventory_snapshots', 'skills')
+        }
+        before = self.counts(conn)
+
+        pruned = self.prune(conn, 5)
+        after = self.counts(conn)
+
+        self.assertGreater(pruned['game_states'], 0)
+        self.assertGreater(pruned['inventory_snapshots'], 0)
+        self.assertGreater(pruned['skills'], 0)
+        for table, count in pruned.items():
+            self.assertEqual(after[table], before[table] - count, table)
+        for table in ('inventory_snapshots', 'skills', 'session_stats'):
+            self.assertEqual(self.orphans(conn, table), 0, table)
+        for table, count in survivors.items():
+            self.assertEqual(after[table], count, table)
+
+    def test_delta_mode_keeps_base_for_later_snapshots(self):
+        conn = self.generate(delta=True)
+        oldest_kept = conn.execute('''
+            SELECT MIN(id) FROM game_states WHERE timestamp >= datetime('now', '-5 days')
+        ''').fetchone()[0]
+        cursor = conn.cursor()
+        inventory = delta_store.inventory_at(cursor, oldest_kept)
+        skills = [row[:2] for row in delta_store.skills_at(cursor, oldest_kept)]
+        latest_inventory = delta_store.inventory_at(cursor)
+        before = self.counts(conn)
+
+        pruned = self.prune(conn, 5)
+        after = self.counts(conn)
+
+        self.assertGreater(pruned['game_states'], 0)
+        self.assertGreater(pruned['inventory_changes'], 0)
+        for table, count in pruned.items():
+            self.assertEqual(after[table], before[table] - count, table)
+        # At most one change per item is left behind from the pruned range
+        left = conn.execute('''
+            SELECT COUNT(*) - COUNT(DISTINCT item_pid) FROM inventory_changes WHERE snapshot_id < ?
+        ''', (oldest_kept,)).fetchone()[0]
+        self.assertEqual(left, 0)
+        self.assertEqual(delta_store.inventory_at(cursor, oldest_kept), inventory)
+        self.assertEqual([row[:2] for row in delta_store.skills_at(cursor, oldest_kept)], skills)
+        self.assertEqual(delta_store.inventory_at(cursor), latest_inventory)
+
+    def test_delta_mode_repeated_prunes(self):
+        db_path = str(Path(self.tmp.name) / 'game_data.db')
+        GameDataCollector(self.tmp.name, db_path, delta=True).close()
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        self.addCleanup(conn.close)
+        # Snapshots 10, 20 and 30 taken 10, 6 and 1 days ago; rollups reach now
+        conn.executemany('''
+            INSERT INTO game_states (id, timestamp) VALUES (?, datetime('now', ?))
+        ''', [(10, '-10 days'), (20, '-6 days'), (30, '-1 days')])
+        conn.execute("INSERT INTO game_states_1h (bucket) VALUES (strftime('%Y-%m-%d %H:00:00', 'now'))")
+        conn.executemany('''
+            INSERT INTO inventory_changes (snapshot_id, item_pid, item_name, quantity) VALUES (?, ?, ?, ?)
+        ''', [(10, 7, 'gun', 5), (10, 8, 'stimpak', 1), (20, 7, 'gun', 0), (30, 9, 'rope', 1)])
+        conn.executemany('''
+            INSERT INTO skill_changes (snapshot_id, skill_name, skill_value) VALUES (?, ?, ?)
+        ''', [(10, 'Small Guns', 40), (20, 'Small Guns', 45)])
+        cursor = conn.cursor()
+
+        # Snapshot 10 goes: its changes stay as the base of later snapshots
+        self.prune(conn, 8)
+        self.assertEqual(delta_store.inventory_at(cursor), [(8, 'stimpak', 1), (9, 'rope', 1)])
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM inventory_changes').fetchone()[0], 4)
+
+        # Snapshot 20 goes: the gun's removal takes its old base with it, and
+        # the newer skill value replaces the old base
+        pruned = self.prune(conn, 3)
+        self.assertEqual(pruned['inventory_changes'], 2)
+        self.assertEqual(pruned['skill_changes'], 1)
+        self.assertEqual(delta_store.inventory_at(cursor), [(8, 'stimpak', 1), (9, 'rope', 1)])
+        self.assertEqual([row[:2] for row in delta_store.skills_at(cursor)], [('Small Guns', 45)])
+        self.assertEqual(conn.execute('''
+            SELECT COUNT(*) FROM inventory_changes WHERE item_pid = 7
+        ''').fetchone()[0], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()